@@ -0,0 +1,206 @@
+# Vectorized evaluation of many positions at once.
+#
+# Positions are packed into an (N, 64) int8 array indexed by bit index
+# (y * 8 + x, see bitboard.py) holding 0 for an empty square, 1 to 6 for a
+# white pawn, knight, bishop, rook, queen or king and -1 to -6 for the black
+# ones. Every term is computed for the whole batch with NumPy operations and
+# is scored from white's point of view.
+#
+# NumPy is only needed by this module.
+
+import numpy as np
+
+import bitboard
+from bitboard import (PIECE_NAMES, PIECE_TYPES, KNIGHT_ATTACKS, KING_ATTACKS, PAWN_PUSHES, PAWN_DOUBLES, PAWN_ATTACKS,
+                      coords, squares)
+from evaluation import PIECE_VALUES, PIECE_SQUARE_TABLES
+
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(1, 7)
+# int8 code of every piece name, negative for black
+PIECE_CODES = {"": 0}
+for _name in PIECE_NAMES:
+    _code = PIECE_TYPES.index(_name[6:]) + 1
+    PIECE_CODES[_name] = _code if _name[:5] == "white" else -_code
+
+# score of a move a piece can make
+MOBILITY_WEIGHT = 4
+# score of each friendly pawn next to the king, and of each enemy piece
+# within two squares of it
+SHELTER_WEIGHT = 10
+ATTACKER_WEIGHT = 15
+
+
+def bonus_table():
+    # (13, 64) square bonus of each code, indexed by code + 6
+    table = np.zeros((13, 64), dtype=np.int32)
+    for kind in PIECE_TYPES:
+        code = PIECE_TYPES.index(kind) + 1
+        bonus = np.array(PIECE_SQUARE_TABLES[kind], dtype=np.int32)
+        table[6 + code] = bonus
+        # flip the rows for black
+        table[6 - code] = -bonus.reshape(8, 8)[::-1].reshape(64)
+    return table
+
+
+def value_table():
+    # material of each code, indexed by code + 6
+    table = np.zeros(13, dtype=np.int32)
+    for kind in PIECE_TYPES:
+        code = PIECE_TYPES.index(kind) + 1
+        table[6 + code] = PIECE_VALUES[kind]
+        table[6 - code] = -PIECE_VALUES[kind]
+    return table
+
+
+def attack_matrix(table):
+    # (64, 64) matrix from a list of 64 attack bitboards, with a 1 where the
+    # piece on the row's square attacks the column's square; float32 so the
+    # products below run through BLAS
+    matrix = np.zeros((64, 64), dtype=np.float32)
+    for sq, attacks in enumerate(table):
+        for target in squares(attacks):
+            matrix[sq, target] = 1
+    return matrix
+
+
+def shift(grid, dx, dy):
+    # move every square of an (N, 8, 8) array by dx columns and dy rows,
+    # dropping what leaves the board
+    moved = np.zeros_like(grid)
+    height, width = 8 - abs(dy), 8 - abs(dx)
+    moved[:, max(dy, 0):max(dy, 0) + height, max(dx, 0):max(dx, 0) + width] = \
+        grid[:, max(-dy, 0):max(-dy, 0) + height, max(-dx, 0):max(-dx, 0) + width]
+    return moved
+
+
+def zone_matrix(radius):
+    # (64, 64) bool matrix of the squares within radius king steps
+    matrix = np.zeros((64, 64), dtype=np.float32)
+    for sq in range(64):
+        x, y = coords(sq)
+        for target in range(64):
+            tx, ty = coords(target)
+            if target != sq and max(abs(tx - x), abs(ty - y)) <= radius:
+                matrix[sq, target] = 1
+    return matrix
+
+
+VALUES = value_table()
+SQUARE_BONUS = bonus_table()
+KNIGHT_MATRIX = attack_matrix(KNIGHT_ATTACKS)
+KING_MATRIX = attack_matrix(KING_ATTACKS)
+PAWN_PUSH_MATRIX = {color: attack_matrix(PAWN_PUSHES[color]) for color in PAWN_PUSHES}
+PAWN_DOUBLE_MATRIX = {color: attack_matrix(PAWN_DOUBLES[color]) for color in PAWN_DOUBLES}
+PAWN_ATTACK_MATRIX = {color: attack_matrix(PAWN_ATTACKS[color]) for color in PAWN_ATTACKS}
+# (dx, dy) of a step along each sliding direction
+DIAGONAL_STEPS = ((-1, -1), (1, 1), (-1, 1), (1, -1))
+LINEAR_STEPS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+KING_ZONE = zone_matrix(2)
+# int8 code of every piece code of BitBoard.board
+PACK_CODES = np.zeros(16, dtype=np.int8)
+for _name in PIECE_NAMES:
+    PACK_CODES[bitboard.PIECE_CODES[_name]] = PIECE_CODES[_name]
+
+
+def pack(boards):
+    # (N, 64) int8 array of a sequence of Board objects
+    board_bytes = b"".join(bytes(board.bitboard.board) for board in boards)
+    return PACK_CODES[np.frombuffer(board_bytes, dtype=np.uint8).reshape(-1, 64)]
+
+
+def pack_names(positions):
+    # (N, 64) int8 array of a sequence of lists of 64 piece names, "" for an
+    # empty square
+    return np.array([[PIECE_CODES[name] for name in names] for names in positions],
+                    dtype=np.int8).reshape(-1, 64)
+
+
+def material(positions):
+    return VALUES[positions.astype(np.intp) + 6].sum(axis=1)
+
+
+def square_bonus(positions):
+    return SQUARE_BONUS[positions.astype(np.intp) + 6, np.arange(64)].sum(axis=1)
+
+
+def slider_moves(pieces, own, occupied, steps):
+    # number of moves of the pieces marked in the (N, 64) bool array pieces
+    # along every direction, stopping at the first piece in the way
+    count = np.zeros(len(pieces), dtype=np.int32)
+    pieces = pieces.reshape(-1, 8, 8)
+    empty = ~occupied.reshape(-1, 8, 8)
+    free = ~own.reshape(-1, 8, 8)
+    for dx, dy in steps:
+        sliding = pieces
+        for _ in range(7):
+            sliding = shift(sliding, dx, dy)
+            if not sliding.any():
+                break
+            count += (sliding & free).sum(axis=(1, 2))
+            sliding &= empty
+    return count
+
+
+def moves_to(pieces, matrix, allowed):
+    # number of moves of the pieces marked in pieces through an attack
+    # matrix onto the squares marked in allowed
+    return ((pieces.astype(np.float32) @ matrix) * allowed).sum(axis=1).astype(np.int32)
+
+
+def mobility(positions, color):
+    # number of moves of one side, following BitBoard.targets
+    sign = 1 if color == "white" else -1
+    codes = positions * sign
+    own = codes > 0
+    enemy = codes < 0
+    occupied = own | enemy
+    free = ~own
+
+    count = moves_to(codes == KNIGHT, KNIGHT_MATRIX, free)
+    count += moves_to(codes == KING, KING_MATRIX, free)
+    count += slider_moves((codes == BISHOP) | (codes == QUEEN), own, occupied, DIAGONAL_STEPS)
+    count += slider_moves((codes == ROOK) | (codes == QUEEN), own, occupied, LINEAR_STEPS)
+
+    # pawns move forward unless a pawn of either side is in front of them,
+    # then the two-step move is allowed as well, and they capture diagonally
+    own_pawns = codes == PAWN
+    push = PAWN_PUSH_MATRIX[color]
+    blocked = (np.abs(positions) == PAWN).astype(np.float32) @ push.T
+    unblocked = own_pawns & (blocked == 0)
+    count += moves_to(unblocked, push, free)
+    count += moves_to(unblocked, PAWN_DOUBLE_MATRIX[color], free)
+    count += moves_to(own_pawns, PAWN_ATTACK_MATRIX[color], enemy)
+    return count
+
+
+def king_safety(positions, color):
+    # friendly pawns next to the king against enemy pieces near it
+    sign = 1 if color == "white" else -1
+    codes = positions * sign
+    king = codes == KING
+    shelter = moves_to(king, KING_MATRIX, codes == PAWN)
+    attackers = moves_to(king, KING_ZONE, codes < 0)
+    return SHELTER_WEIGHT * shelter - ATTACKER_WEIGHT * attackers
+
+
+def evaluate(positions, white_to_move=None):
+    # dictionary of every term and their total for an (N, 64) array; scores
+    # are from white's point of view unless white_to_move, an (N,) bool
+    # array, is given, then the total is from the side to move
+    terms = {
+        "material": material(positions),
+        "square_bonus": square_bonus(positions),
+        "mobility": MOBILITY_WEIGHT * (mobility(positions, "white") - mobility(positions, "black")),
+        "king_safety": king_safety(positions, "white") - king_safety(positions, "black"),
+    }
+    total = sum(terms.values())
+    if white_to_move is not None:
+        total = np.where(white_to_move, total, -total)
+    terms["total"] = total
+    return terms
+
+
+def evaluate_boards(boards):
+    # total score of a sequence of Board objects from the side to move
+    white_to_move = np.array([bool(board.turn["white"]) for board in boards], dtype=bool)
+    return evaluate(pack(boards), white_to_move)["total"]
@@ -0,0 +1,608 @@
+# Bitboard representation of the chess board.
+#
+# Every square is one bit of a 64-bit integer. The bit index of a square is
+# y * 8 + x, where x is the column (0 = "a") and y is the row counted from the
+# top of the board (0 = row 8), the same [x, y] coordinates used by Chess.
+
+# all 64 squares
+FULL = 0xFFFFFFFFFFFFFFFF
+# squares of the "a" column (x == 0) and the "h" column (x == 7)
+A_FILE = 0x0101010101010101
+H_FILE = 0x8080808080808080
+# masks removing the squares that wrapped around the board edge after a shift
+NOT_A_FILE = FULL ^ A_FILE
+NOT_H_FILE = FULL ^ H_FILE
+NOT_AB_FILE = NOT_A_FILE & (NOT_A_FILE << 1)
+NOT_GH_FILE = NOT_H_FILE & (NOT_H_FILE >> 1)
+
+COLORS = ("black", "white")
+PIECE_TYPES = ("pawn", "knight", "bishop", "rook", "queen", "king")
+PIECE_NAMES = tuple(color + "_" + kind for color in COLORS for kind in PIECE_TYPES)
+OPPONENT = {"black": "white", "white": "black"}
+
+# Pieces are stored as small ints: the type in the low three bits and BLACK
+# for black pieces, so piece & KIND gives the type and piece & BLACK the
+# color. 0 is an empty square.
+EMPTY = 0
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(1, 7)
+KIND = 7
+WHITE = 0
+BLACK = 8
+# color bit of each color name, and color name of each piece >> 3
+COLOR_BITS = {"white": WHITE, "black": BLACK}
+COLOR_NAMES = ("white", "black")
+# code of every piece name, and name of every code, "" for unused codes
+PIECE_CODES = {name: COLOR_BITS[name[:5]] | (PIECE_TYPES.index(name[6:]) + 1) for name in PIECE_NAMES}
+CODE_NAMES = [""] * 16
+for _name, _code in PIECE_CODES.items():
+    CODE_NAMES[_code] = _name
+# pieces of the first row of each side, from the "a" column
+BACK_RANK = (ROOK, KNIGHT, BISHOP, QUEEN, KING, BISHOP, KNIGHT, ROOK)
+
+# (shift, wrap mask) of each sliding direction
+DIAGONAL_DIRECTIONS = ((-9, NOT_H_FILE), (9, NOT_A_FILE), (7, NOT_H_FILE), (-7, NOT_A_FILE))
+LINEAR_DIRECTIONS = ((-1, NOT_H_FILE), (1, NOT_A_FILE), (-8, FULL), (8, FULL))
+
+
+def square(x, y):
+    # convert [x, y] board coordinates to a bit index
+    return y * 8 + x
+
+
+def coords(sq):
+    # convert a bit index to [x, y] board coordinates
+    return [sq & 7, sq >> 3]
+
+
+def location(sq):
+    # board location of a bit index, such as "e2"
+    return chr(97 + (sq & 7)) + str(8 - (sq >> 3))
+
+
+def encode_move(src, dst):
+    # pack a move between two bit indexes into one integer
+    return src | (dst << 6)
+
+
+def squares(bb):
+    # yield the bit index of every set bit, lowest first
+    while bb:
+        low = bb & -bb
+        yield low.bit_length() - 1
+        bb ^= low
+
+
+def ray_attacks(origin, directions, occupied):
+    # squares reached by sliding from the origin bit until a piece is hit
+    attacks = 0
+    for step, mask in directions:
+        bb = origin
+        while bb:
+            if step > 0:
+                bb = (bb << step) & mask & FULL
+            else:
+                bb = (bb >> -step) & mask
+            attacks |= bb
+            # stop when blocked by a piece
+            bb &= ~occupied
+    return attacks
+
+
+def knight_attacks(origin):
+    return (((origin << 17) & NOT_A_FILE) | ((origin << 15) & NOT_H_FILE) |
+            ((origin << 10) & NOT_AB_FILE) | ((origin << 6) & NOT_GH_FILE) |
+            ((origin >> 17) & NOT_H_FILE) | ((origin >> 15) & NOT_A_FILE) |
+            ((origin >> 10) & NOT_GH_FILE) | ((origin >> 6) & NOT_AB_FILE)) & FULL
+
+
+def king_attacks(origin):
+    row = origin | ((origin << 1) & NOT_A_FILE) | ((origin >> 1) & NOT_H_FILE)
+    return (row | (row << 8) | (row >> 8)) & FULL & ~origin
+
+
+def subsets(mask):
+    # yield every subset of the bits in mask, starting with the empty set
+    sub = 0
+    while True:
+        yield sub
+        sub = (sub - mask) & mask
+        if sub == 0:
+            break
+
+
+def line_table(sq, directions):
+    # occupancy-indexed attacks along the rays through sq
+    # returns (mask, table) where table[occupied & mask] gives the attacks
+    origin = 1 << sq
+    mask = 0
+    for step, wrap in directions:
+        ray = ray_attacks(origin, ((step, wrap),), 0)
+        if ray:
+            # a piece on the last square of a ray never blocks anything
+            edge = 1 << (ray.bit_length() - 1) if step > 0 else ray & -ray
+            mask |= ray ^ edge
+    table = {}
+    for occupied in subsets(mask):
+        table[occupied] = ray_attacks(origin, directions, occupied)
+    return mask, table
+
+
+def pawn_tables(color):
+    # front square, two-step square and capture squares of a pawn on each square
+    pushes, doubles, captures = [], [], []
+    for sq in range(64):
+        x, y = coords(sq)
+        front = double = capture = 0
+        # black pawns move down the board, white pawns move up
+        forward = 1 if color == "black" else -1
+        if 0 <= y + forward < 8:
+            front = 1 << square(x, y + forward)
+            # pawns can move two positions ahead for first move
+            if (color == "black" and y < 2) or (color == "white" and y > 5):
+                double = 1 << square(x, y + 2 * forward)
+            for dx in (-1, 1):
+                if 0 <= x + dx < 8:
+                    capture |= 1 << square(x + dx, y + forward)
+        pushes.append(front)
+        doubles.append(double)
+        captures.append(capture)
+    return pushes, doubles, captures
+
+
+def double_sources(color):
+    # squares a pawn double steps from to reach each square
+    sources = [0] * 64
+    for sq, double in enumerate(PAWN_DOUBLES[color]):
+        if double:
+            sources[double.bit_length() - 1] |= 1 << sq
+    return sources
+
+
+def between_table():
+    # BETWEEN[a][b] holds the squares strictly between a and b when they
+    # share a row, column or diagonal, and 0 otherwise
+    table = [[0] * 64 for _ in range(64)]
+    for sq in range(64):
+        for step, wrap in DIAGONAL_DIRECTIONS + LINEAR_DIRECTIONS:
+            bb = 1 << sq
+            path = 0
+            while True:
+                if step > 0:
+                    bb = (bb << step) & wrap & FULL
+                else:
+                    bb = (bb >> -step) & wrap
+                if not bb:
+                    break
+                table[sq][bb.bit_length() - 1] = path
+                path |= bb
+    return table
+
+
+# attack tables, built once at import
+KNIGHT_ATTACKS = [knight_attacks(1 << sq) for sq in range(64)]
+KING_ATTACKS = [king_attacks(1 << sq) for sq in range(64)]
+PAWN_PUSHES, PAWN_DOUBLES, PAWN_ATTACKS = {}, {}, {}
+for _color in COLORS:
+    PAWN_PUSHES[_color], PAWN_DOUBLES[_color], PAWN_ATTACKS[_color] = pawn_tables(_color)
+PAWN_DOUBLE_SOURCES = {color: double_sources(color) for color in COLORS}
+BETWEEN = between_table()
+
+# sliding attacks split into lines: RANK_MASK[sq] selects the pieces that can
+# block a rook along the row of sq, and RANK_ATTACKS[sq][occupied & RANK_MASK[sq]]
+# gives its attacks along that row; likewise for columns and the two diagonals
+RANK_MASK, RANK_ATTACKS = zip(*[line_table(sq, LINEAR_DIRECTIONS[:2]) for sq in range(64)])
+FILE_MASK, FILE_ATTACKS = zip(*[line_table(sq, LINEAR_DIRECTIONS[2:]) for sq in range(64)])
+DIAGONAL_MASK, DIAGONAL_ATTACKS = zip(*[line_table(sq, DIAGONAL_DIRECTIONS[:2]) for sq in range(64)])
+ANTI_DIAGONAL_MASK, ANTI_DIAGONAL_ATTACKS = zip(*[line_table(sq, DIAGONAL_DIRECTIONS[2:]) for sq in range(64)])
+
+
+def bishop_attacks(sq, occupied):
+    return (DIAGONAL_ATTACKS[sq][occupied & DIAGONAL_MASK[sq]] |
+            ANTI_DIAGONAL_ATTACKS[sq][occupied & ANTI_DIAGONAL_MASK[sq]])
+
+
+def rook_attacks(sq, occupied):
+    return (RANK_ATTACKS[sq][occupied & RANK_MASK[sq]] |
+            FILE_ATTACKS[sq][occupied & FILE_MASK[sq]])
+
+
+def queen_attacks(sq, occupied):
+    return (DIAGONAL_ATTACKS[sq][occupied & DIAGONAL_MASK[sq]] |
+            ANTI_DIAGONAL_ATTACKS[sq][occupied & ANTI_DIAGONAL_MASK[sq]] |
+            RANK_ATTACKS[sq][occupied & RANK_MASK[sq]] |
+            FILE_ATTACKS[sq][occupied & FILE_MASK[sq]])
+
+
+# attacks of each sliding piece type, None for the others
+SLIDER_ATTACKS = [None, None, None, bishop_attacks, rook_attacks, queen_attacks, None]
+# legal_state of a side without a king: every move is legal
+NO_KING_STATE = (FULL, FULL, FULL, {}, 0)
+
+
+class BitBoard(object):
+    def __init__(self):
+        # occupancy of each piece code, e.g. self.pieces[BLACK | ROOK]
+        self.pieces = [0] * 16
+        # occupancy of each color
+        self.colors = {"black": 0, "white": 0}
+        # occupancy of both colors
+        self.occupied = 0
+        # pawns of both colors, pawns are blocked by any pawn in front of them
+        self.pawns = 0
+        # piece code on each square, EMPTY for an empty square
+        self.board = bytearray(64)
+        # squares of the pieces of each color, in no particular order
+        self.piece_lists = {"black": [], "white": []}
+        # squares attacked by the piece on each square, see attacks_from,
+        # brought up to date with the moves since the last update by update
+        self.attacks = [0] * 64
+        # squares changed by those moves, see update
+        self.pending = (0, 0, 0)
+        # union of the attacks of each color, computed when first needed
+        self.attack_maps = {}
+        # legal_state of each color, computed when first needed
+        self.legal_states = {}
+        # (attacks, pending, attack_maps, legal_states) before every move
+        self.undo = []
+
+    def clear(self):
+        self.pieces = [0] * 16
+        self.colors["black"] = 0
+        self.colors["white"] = 0
+        self.occupied = 0
+        self.pawns = 0
+        self.board = bytearray(64)
+        self.piece_lists = {"black": [], "white": []}
+        self.attacks = [0] * 64
+        self.pending = (0, 0, 0)
+        self.attack_maps = {}
+        self.legal_states = {}
+        self.undo = []
+
+    def copy(self):
+        # independent copy, sharing the attacks saved for unmove which are
+        # never changed in place
+        bb = BitBoard.__new__(BitBoard)
+        bb.pieces = list(self.pieces)
+        bb.colors = dict(self.colors)
+        bb.occupied = self.occupied
+        bb.pawns = self.pawns
+        bb.board = bytearray(self.board)
+        bb.piece_lists = {color: list(squares) for color, squares in self.piece_lists.items()}
+        bb.attacks = self.attacks
+        bb.pending = self.pending
+        bb.attack_maps = dict(self.attack_maps)
+        bb.legal_states = dict(self.legal_states)
+        bb.undo = list(self.undo)
+        return bb
+
+    def put(self, piece, sq):
+        bit = 1 << sq
+        color = COLOR_NAMES[piece >> 3]
+        self.pieces[piece] |= bit
+        self.colors[color] |= bit
+        self.occupied |= bit
+        if piece & KIND == PAWN:
+            self.pawns |= bit
+        self.board[sq] = piece
+        self.piece_lists[color].append(sq)
+
+    def remove(self, sq):
+        piece = self.board[sq]
+        if piece:
+            mask = ~(1 << sq)
+            color = COLOR_NAMES[piece >> 3]
+            self.pieces[piece] &= mask
+            self.colors[color] &= mask
+            self.occupied &= mask
+            self.pawns &= mask
+            self.board[sq] = EMPTY
+            self.piece_lists[color].remove(sq)
+        return piece
+
+    def move(self, src, dst):
+        # move the piece on src to dst, returning the captured piece
+        occupied, pawns = self.occupied, self.pawns
+        captured = self.remove(dst)
+        self.put(self.remove(src), dst)
+        self.undo.append((self.attacks, self.pending, self.attack_maps, self.legal_states))
+        self.moved(src, dst, occupied, pawns)
+        return captured
+
+    def unmove(self, src, dst, captured):
+        # take back a move from src to dst that captured the given piece
+        occupied, pawns = self.occupied, self.pawns
+        self.put(self.remove(dst), src)
+        if captured:
+            self.put(captured, dst)
+        if self.undo:
+            self.attacks, self.pending, self.attack_maps, self.legal_states = self.undo.pop()
+        else:
+            # a copied board does not have the attacks before its first move
+            self.moved(src, dst, occupied, pawns)
+
+    def moved(self, src, dst, occupied, pawns):
+        # note the squares changed by a move, given the occupancy and pawns
+        # before it: the attacks are only updated when next needed, so the
+        # moves of a search that never looks at them cost nothing
+        changed = (1 << src) | (1 << dst)
+        pieces, emptied, pawns_changed = self.pending
+        self.pending = (pieces | changed, emptied | (changed & (occupied ^ self.occupied)),
+                        pawns_changed | (changed & (pawns ^ self.pawns)))
+        self.attack_maps = {}
+        self.legal_states = {}
+
+    def attacks_from(self, piece, sq):
+        # squares the piece on sq could capture a king on, including squares
+        # of its own color: a king taking a piece there would be captured
+        kind = piece & KIND
+        if kind == PAWN:
+            color = COLOR_NAMES[piece >> 3]
+            # pawns also capture any piece but a pawn straight ahead
+            front = PAWN_PUSHES[color][sq]
+            attacks = PAWN_ATTACKS[color][sq] | front
+            if not front & self.pawns:
+                attacks |= PAWN_DOUBLES[color][sq]
+            return attacks
+        if kind == KNIGHT:
+            return KNIGHT_ATTACKS[sq]
+        if kind == KING:
+            return KING_ATTACKS[sq]
+        if kind:
+            return SLIDER_ATTACKS[kind](sq, self.occupied)
+        return 0
+
+    def refresh(self):
+        # recompute the attacks of every piece, after put and remove
+        board = self.board
+        self.attacks = [self.attacks_from(board[sq], sq) for sq in range(64)]
+        self.pending = (0, 0, 0)
+        self.attack_maps = {}
+        self.legal_states = {}
+        self.undo = []
+
+    def update(self):
+        # recompute the attacks of the pieces on the squares changed since the
+        # last update and of the pieces whose attacks depend on them: sliders
+        # reaching a square that was emptied or filled, and pawns in front of
+        # which a pawn came or went
+        changed, moved, pawns = self.pending
+        if not changed:
+            return
+        self.pending = (0, 0, 0)
+        board = self.board
+        # the attacks before are kept by the undo stack
+        attacks = self.attacks = list(self.attacks)
+        pieces = self.pieces
+        affected = changed
+        if pawns:
+            affected |= ((pawns << 8) & pieces[WHITE | PAWN]) | ((pawns >> 8) & pieces[BLACK | PAWN])
+        occupied = self.occupied
+        queens = pieces[BLACK | QUEEN] | pieces[WHITE | QUEEN]
+        rooks = pieces[BLACK | ROOK] | pieces[WHITE | ROOK] | queens
+        bishops = pieces[BLACK | BISHOP] | pieces[WHITE | BISHOP] | queens
+        while moved:
+            low = moved & -moved
+            sq = low.bit_length() - 1
+            affected |= (rook_attacks(sq, occupied) & rooks) | (bishop_attacks(sq, occupied) & bishops)
+            moved ^= low
+        while affected:
+            low = affected & -affected
+            sq = low.bit_length() - 1
+            attacks[sq] = self.attacks_from(board[sq], sq)
+            affected ^= low
+
+    def attack_map(self, color):
+        # squares attacked by the pieces of color
+        attacked = self.attack_maps.get(color)
+        if attacked is None:
+            self.update()
+            attacked = 0
+            attacks = self.attacks
+            pieces = self.colors[color]
+            while pieces:
+                low = pieces & -pieces
+                attacked |= attacks[low.bit_length() - 1]
+                pieces ^= low
+            self.attack_maps[color] = attacked
+        return attacked
+
+    def in_check(self, color):
+        return bool(self.pieces[COLOR_BITS[color] | KING] & self.attack_map(OPPONENT[color]))
+
+    def legal_state(self, color):
+        # masks restricting the moves of color to the legal ones, as
+        # (king targets, targets of the other pieces, targets of pawns,
+        # {pinned square: squares it can move to}, frozen squares)
+        state = self.legal_states.get(color)
+        if state is not None:
+            return state
+        bit = COLOR_BITS[color]
+        enemy_bit = bit ^ BLACK
+        king = self.pieces[bit | KING]
+        if not king:
+            self.legal_states[color] = NO_KING_STATE
+            return NO_KING_STATE
+        ksq = king.bit_length() - 1
+        enemy = OPPONENT[color]
+        enemy_pieces = self.colors[enemy]
+        occupied = self.occupied
+        danger = self.attack_map(enemy)
+        attacks = self.attacks
+        board = self.board
+
+        # enemy pieces giving check
+        checkers = 0
+        if king & danger:
+            for sq in squares(enemy_pieces):
+                if attacks[sq] & king:
+                    checkers |= 1 << sq
+
+        # the king cannot step onto attacked squares, nor away from a
+        # checking slider along its line
+        king_targets = KING_ATTACKS[ksq] & ~self.colors[color] & ~danger
+        for sq in squares(checkers):
+            slider_attacks = SLIDER_ATTACKS[board[sq] & KIND]
+            if slider_attacks is not None:
+                king_targets &= ~slider_attacks(sq, occupied ^ king)
+
+        # pieces pinned to the king by a slider can only move along the pin
+        pins = {}
+        queens = self.pieces[enemy_bit | QUEEN]
+        for lines, sliders in ((rook_attacks, self.pieces[enemy_bit | ROOK] | queens),
+                               (bishop_attacks, self.pieces[enemy_bit | BISHOP] | queens)):
+            for sq in squares(lines(ksq, enemy_pieces) & sliders):
+                between = BETWEEN[ksq][sq] & occupied
+                if between and not between & (between - 1):
+                    pins[between.bit_length() - 1] = BETWEEN[ksq][sq] | (1 << sq)
+
+        # in check the other pieces must capture the checker or block it,
+        # and only a pawn blocks a pawn's double step
+        if not checkers:
+            targets = pawn_targets = FULL
+        elif checkers & (checkers - 1):
+            targets = pawn_targets = 0
+        else:
+            csq = checkers.bit_length() - 1
+            targets = pawn_targets = checkers | BETWEEN[ksq][csq]
+            if board[csq] & KIND == PAWN:
+                targets = checkers
+
+        # a pawn in front of an enemy pawn that could double step onto the
+        # king must stay a pawn: it cannot move, and only a pawn can take it
+        frozen = 0
+        for sq in squares(self.pieces[enemy_bit | PAWN] & PAWN_DOUBLE_SOURCES[enemy][ksq]):
+            front = PAWN_PUSHES[enemy][sq]
+            if front & self.pawns:
+                frozen |= front
+
+        state = (king_targets, targets & ~frozen, pawn_targets, pins, frozen)
+        self.legal_states[color] = state
+        return state
+
+    def legal_targets(self, piece, sq):
+        # bitboard of the squares the piece on sq can move to without leaving
+        # its king in check
+        king_targets, targets, pawn_targets, pins, frozen = self.legal_state(COLOR_NAMES[piece >> 3])
+        kind = piece & KIND
+        if kind == KING:
+            return self.targets(piece, sq) & king_targets
+        if frozen >> sq & 1:
+            return 0
+        legal = self.targets(piece, sq) & (pawn_targets if kind == PAWN else targets)
+        pin = pins.get(sq)
+        if pin is not None:
+            legal &= pin
+        return legal
+
+    def legal_sources(self, color, captures_only=False):
+        # (square, legal targets) of every piece of color that can move, the
+        # least valuable pieces first
+        king_targets, targets, pawn_targets, pins, frozen = self.legal_state(color)
+        own = self.colors[color]
+        enemy = self.colors[OPPONENT[color]]
+        occupied = self.occupied
+        pieces = self.pieces
+        # squares a piece may land on
+        allowed = enemy if captures_only else FULL ^ own
+        bit = COLOR_BITS[color]
+        sources = []
+        for kind in range(PAWN, KING + 1):
+            movers = pieces[bit | kind] & ~frozen
+            if not movers:
+                continue
+            if kind == KING:
+                src = movers.bit_length() - 1
+                legal = KING_ATTACKS[src] & allowed & king_targets
+                if legal:
+                    sources.append((src, legal))
+                continue
+            while movers:
+                low = movers & -movers
+                src = low.bit_length() - 1
+                movers ^= low
+                if kind == PAWN:
+                    legal = PAWN_ATTACKS[color][src] & enemy
+                    front = PAWN_PUSHES[color][src]
+                    if front and not front & self.pawns:
+                        legal |= front | PAWN_DOUBLES[color][src]
+                    legal &= allowed & pawn_targets
+                elif kind == KNIGHT:
+                    legal = KNIGHT_ATTACKS[src] & allowed & targets
+                else:
+                    legal = SLIDER_ATTACKS[kind](src, occupied) & allowed & targets
+                if pins and src in pins:
+                    legal &= pins[src]
+                if legal:
+                    sources.append((src, legal))
+        return sources
+
+    def legal_moves(self, color, moves=None, captures_only=False):
+        # append the encoded legal moves of color to moves and return it;
+        # search loops can pass a list or array("H") they reuse
+        if moves is None:
+            moves = []
+        append = moves.append
+        for src, legal in self.legal_sources(color, captures_only):
+            while legal:
+                bit = legal & -legal
+                append(src | ((bit.bit_length() - 1) << 6))
+                legal ^= bit
+        return moves
+
+    def iter_legal_moves(self, color, captures_only=False):
+        # yield the legal moves of color in stages: captures of the most
+        # valuable pieces by the least valuable ones first, then quiet moves,
+        # so a search that cuts off early never generates the later stages
+        sources = self.legal_sources(color, captures_only)
+        enemy_bit = COLOR_BITS[OPPONENT[color]]
+        for kind in range(KING, EMPTY, -1):
+            victims = self.pieces[enemy_bit | kind]
+            if victims:
+                for src, legal in sources:
+                    for dst in squares(legal & victims):
+                        yield src | (dst << 6)
+        if not captures_only:
+            empty = FULL ^ self.occupied
+            for src, legal in sources:
+                for dst in squares(legal & empty):
+                    yield src | (dst << 6)
+
+    def has_legal_move(self, color):
+        board = self.board
+        for sq in squares(self.colors[color]):
+            if self.legal_targets(board[sq], sq):
+                return True
+        return False
+
+    def targets(self, piece, sq):
+        # bitboard of the squares the piece on sq can move to, ignoring checks
+        color = COLOR_NAMES[piece >> 3]
+        kind = piece & KIND
+
+        if kind == PAWN:
+            targets = 0
+            front = PAWN_PUSHES[color][sq]
+            # pawns cannot move when blocked by another pawn
+            if front and not front & self.pawns:
+                targets = front | PAWN_DOUBLES[color][sq]
+            # pawns capture diagonally forward
+            targets |= PAWN_ATTACKS[color][sq] & self.colors[OPPONENT[color]]
+        elif kind == KNIGHT:
+            targets = KNIGHT_ATTACKS[sq]
+        elif kind == KING:
+            targets = KING_ATTACKS[sq]
+        elif kind:
+            targets = SLIDER_ATTACKS[kind](sq, self.occupied)
+        else:
+            return 0
+
+        # pieces cannot move onto pieces of their own color
+        return targets & ~self.colors[color]
+
+    def possible_moves(self, piece, piece_coord):
+        # legal moves of a piece, as a list of [x, y] coordinates
+        if not piece:
+            return []
+        x, y = piece_coord
+        return [[sq & 7, sq >> 3] for sq in squares(self.legal_targets(piece, y * 8 + x))]
@@ -0,0 +1,390 @@
+import random
+
+from bitboard import (BitBoard, square, encode_move, PIECE_CODES, COLOR_NAMES, BACK_RANK,
+                      PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, KIND, WHITE, BLACK)
+from evaluation import PIECE_SCORES, board_score
+from zobrist import PIECE_KEYS, SIDE_KEY, board_hash, pawn_hash
+
+# move generators Board can use, see Board.possible_moves
+MOVE_BACKENDS = ("array", "bitboard")
+
+# (dx, dy) steps of the pieces for the "array" backend
+KNIGHT_STEPS = ((-2, -1), (-2, 1), (-1, -2), (1, -2), (2, -1), (2, 1), (-1, 2), (1, 2))
+KING_STEPS = ((0, -1), (0, 1), (-1, 0), (-1, -1), (-1, 1), (1, 0), (1, -1), (1, 1))
+DIAGONAL_STEPS = ((-1, -1), (1, 1), (-1, 1), (1, -1))
+LINEAR_STEPS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+
+class Board(object):
+    """Chess rules and board state, without any pygame dependency"""
+    def __init__(self, backend="bitboard"):
+        # dictionary to keeping track of player turn
+        self.turn = {"black": 0,
+                     "white": 0}
+
+        # list containing captured pieces
+        self.captured = []
+        #
+        self.winner = ""
+
+        # name of the move generator used by possible_moves
+        if backend not in MOVE_BACKENDS:
+            raise ValueError("unknown move backend: {}".format(backend))
+        self.backend = backend
+        # board state: piece codes, bitboards and attacks, see bitboard.py
+        self.bitboard = BitBoard()
+        # optional record.GameRecordWriter the played moves are appended to
+        self.recorder = None
+
+        self.reset()
+
+    def clear(self):
+        # empty the board, the piece on each square lives in the bitboards
+        # as a piece code, see bitboard.py
+        self.bitboard.clear()
+        # bit index of the selected square
+        self.selected = None
+        # undo stack of (move, captured piece, previous winner, previous hash)
+        self.history = []
+        # Zobrist hash of the position, see zobrist.py
+        self.hash = 0
+        # hash of the pawns alone, see evaluation.PawnTable
+        self.pawn_hash = 0
+        # material and square bonus from white's point of view, see evaluation.py
+        self.score = 0
+        # move number of the position the board was set up from, as in a FEN
+        self.start_move_number = 1
+
+    def set_turn(self, turn):
+        # give the turn to "black" or "white"
+        self.turn["black"] = int(turn == "black")
+        self.turn["white"] = int(turn == "white")
+
+    def side_to_move(self):
+        return "black" if self.turn["black"] else "white"
+
+    def move_number(self):
+        # FEN move number of the current position, it goes up after every
+        # move of black counting from the position the board was set up from
+        black_started = self.turn["black"] != len(self.history) % 2
+        return self.start_move_number + (len(self.history) + black_started) // 2
+
+    def reset(self, turn=None):
+        # randomize player turn unless a side is given
+        if turn is None:
+            x = random.randint(0, 1)
+            turn = "black" if x == 1 else "white"
+        self.set_turn(turn)
+
+        # empty the board and forget the previous game
+        self.clear()
+        self.captured = []
+        self.winner = ""
+
+        # reset the board, black on the top rows and white on the bottom ones
+        bitboard = self.bitboard
+        for x, kind in enumerate(BACK_RANK):
+            bitboard.put(BLACK | kind, square(x, 0))
+            bitboard.put(BLACK | PAWN, square(x, 1))
+            bitboard.put(WHITE | PAWN, square(x, 6))
+            bitboard.put(WHITE | kind, square(x, 7))
+
+        # attacks, hashes and score of the new board
+        bitboard.refresh()
+        self.hash = board_hash(bitboard.board, turn)
+        self.pawn_hash = pawn_hash(bitboard.board)
+        self.score = board_score(bitboard.board)
+
+        # start recording the new game, an unfinished one is written as unfinished
+        if self.recorder is not None:
+            self.recorder.begin_game(turn)
+
+    def set_recorder(self, recorder):
+        # record the current and all later games with a GameRecordWriter
+        self.recorder = recorder
+        recorder.begin_game(self.side_to_move())
+
+    def set_position(self, pieces, turn):
+        # set up an arbitrary position from a {"e1": "white_king", ...} dictionary
+        self.set_turn(turn)
+        self.clear()
+        for location, piece_name in pieces.items():
+            self.bitboard.put(PIECE_CODES[piece_name], square(ord(location[0]) - 97, 8 - int(location[1:])))
+        self.bitboard.refresh()
+        self.hash = board_hash(self.bitboard.board, turn)
+        self.pawn_hash = pawn_hash(self.bitboard.board)
+        self.score = board_score(self.bitboard.board)
+        self.captured = []
+        self.winner = ""
+        # arbitrary positions cannot be replayed from a record
+        if self.recorder is not None:
+            self.recorder.end_game()
+
+    def copy(self):
+        # independent copy of the board state
+        board = Board.__new__(Board)
+        board.turn = dict(self.turn)
+        board.captured = list(self.captured)
+        board.winner = self.winner
+        board.backend = self.backend
+        board.bitboard = self.bitboard.copy()
+        board.selected = self.selected
+        board.history = list(self.history)
+        board.hash = self.hash
+        board.start_move_number = self.start_move_number
+        board.pawn_hash = self.pawn_hash
+        board.score = self.score
+        board.recorder = None
+        return board
+
+    def repetitions(self):
+        # number of earlier positions in the history identical to this one
+        return sum(1 for entry in self.history if entry[3] == self.hash)
+
+    def in_check(self):
+        # the king of the side to move is attacked
+        return self.bitboard.in_check(self.side_to_move())
+
+    def update_winner(self):
+        # end the game when the side to move has no legal move, a win for the
+        # other side when its king is in check and a draw otherwise
+        turn = self.side_to_move()
+        if len(self.winner) == 0 and not self.bitboard.has_legal_move(turn):
+            if self.bitboard.in_check(turn):
+                self.winner = "White" if turn == "black" else "Black"
+            else:
+                self.winner = "Draw"
+        return self.winner
+
+    def legal_moves(self, moves=None, captures_only=False):
+        # every legal move of the side to move as encoded moves appended to
+        # moves, see BitBoard.legal_moves
+        turn = self.side_to_move()
+        if self.backend == "bitboard":
+            return self.bitboard.legal_moves(turn, moves, captures_only)
+        if moves is None:
+            moves = []
+        board = self.bitboard.board
+        # copied, trying the moves reorders the piece list
+        for sq in list(self.bitboard.piece_lists[turn]):
+            for x, y in self.possible_moves(board[sq], [sq & 7, sq >> 3]):
+                if not captures_only or board[y * 8 + x]:
+                    moves.append(encode_move(sq, square(x, y)))
+        return moves
+
+    def iter_legal_moves(self, captures_only=False):
+        # legal moves of the side to move generated lazily, captures first
+        return self.bitboard.iter_legal_moves(self.side_to_move(), captures_only)
+
+    # method to find the possible moves of the selected piece
+    def possible_moves(self, piece, piece_coord):
+        if self.backend == "bitboard":
+            return self.bitboard.possible_moves(piece, piece_coord)
+        # try every move and keep the ones that do not leave the king in check
+        src = square(piece_coord[0], piece_coord[1])
+        color = COLOR_NAMES[piece >> 3]
+        positions = []
+        for x, y in self.array_possible_moves(piece, piece_coord):
+            self.make_move(encode_move(src, square(x, y)))
+            if not self.bitboard.in_check(color):
+                positions.append([x, y])
+            self.unmake_move()
+        return positions
+
+    # find the possible moves by walking the squares of the board
+    def array_possible_moves(self, piece, piece_coord):
+        board = self.bitboard.board
+        # list to store possible moves of the selected piece
+        positions = []
+        # find the possible locations to put a piece
+        if piece:
+            kind = piece & KIND
+            # get x, y coordinate
+            x_coord, y_coord = piece_coord
+            # calculate moves for bishop
+            if kind == BISHOP:
+                positions = self.diagonal_moves(positions, piece, piece_coord)
+
+            # calculate moves for pawn
+            elif kind == PAWN:
+                # black pawns move down the board, white pawns up
+                if piece & BLACK:
+                    step, enemy, first = 1, WHITE, y_coord < 2
+                else:
+                    step, enemy, first = -1, BLACK, y_coord > 5
+                y = y_coord + step
+                if 0 <= y < 8:
+                    # pawns cannot move when blocked by another pawn
+                    if board[y * 8 + x_coord] & KIND != PAWN:
+                        positions.append([x_coord, y])
+                        # pawns can move two positions ahead for first move
+                        if first:
+                            positions.append([x_coord, y + step])
+
+                    # capture diagonally to the left and to the right
+                    for x in (x_coord - 1, x_coord + 1):
+                        if 0 <= x < 8:
+                            target = board[y * 8 + x]
+                            if target and target & BLACK == enemy:
+                                positions.append([x, y])
+
+            # calculate moves for rook
+            elif kind == ROOK:
+                # find linear moves
+                positions = self.linear_moves(positions, piece, piece_coord)
+
+            # calculate moves for knight and king
+            elif kind == KNIGHT or kind == KING:
+                steps = KNIGHT_STEPS if kind == KNIGHT else KING_STEPS
+                for dx, dy in steps:
+                    x, y = x_coord + dx, y_coord + dy
+                    if 0 <= x < 8 and 0 <= y < 8:
+                        positions.append([x, y])
+
+            # calculate movs for queen
+            elif kind == QUEEN:
+                # find diagonal positions
+                positions = self.diagonal_moves(positions, piece, piece_coord)
+
+                # find linear moves
+                positions = self.linear_moves(positions, piece, piece_coord)
+
+            # remove positions that overlap other pieces of the current player
+            color = piece & BLACK
+            positions = [[x, y] for x, y in positions
+                         if not board[y * 8 + x] or board[y * 8 + x] & BLACK != color]
+
+        # return list containing possible moves for the selected piece
+        return positions
+
+
+    def capture_piece(self, turn, chess_board_coord, piece_coord):
+        # move source piece to its destination, taking the piece there
+        self.validate_move(piece_coord)
+
+
+    def validate_move(self, destination):
+        # nothing to move without a selected piece
+        if self.selected is None:
+            return
+
+        src = self.selected
+        dst = square(destination[0], destination[1])
+        move = encode_move(src, dst)
+        capture = self.bitboard.board[dst] != 0
+
+        # unselect the source piece
+        self.select(None)
+        # move the source piece to the destination
+        self.make_move(move)
+        # checkmate and stalemate end the game
+        self.update_winner()
+
+        if self.recorder is not None:
+            self.recorder.append(move, capture)
+            if len(self.winner) > 0:
+                self.recorder.end_game(self.winner)
+
+        if self.winner == "Black":
+            print("Black wins")
+        elif self.winner == "White":
+            print("White wins")
+        elif self.winner == "Draw":
+            print("Draw")
+
+
+    def select(self, sq):
+        # select the square sq, or clear the selection for None
+        self.selected = sq
+
+
+    def make_move(self, move):
+        # apply an encoded move, see bitboard.encode_move
+        src = move & 63
+        dst = move >> 6
+        board = self.bitboard.board
+        piece = board[src]
+        captured = board[dst]
+
+        # remember what is needed to take the move back
+        self.history.append((move, captured, self.winner, self.hash))
+
+        # update the hash for the moved piece and the side to move
+        keys = PIECE_KEYS[piece]
+        self.hash ^= keys[src] ^ keys[dst] ^ SIDE_KEY
+        scores = PIECE_SCORES[piece]
+        self.score += scores[dst] - scores[src]
+        if piece & KIND == PAWN:
+            self.pawn_hash ^= keys[src] ^ keys[dst]
+
+        if captured:
+            self.hash ^= PIECE_KEYS[captured][dst]
+            self.score -= PIECE_SCORES[captured][dst]
+            if captured & KIND == PAWN:
+                self.pawn_hash ^= PIECE_KEYS[captured][dst]
+            # add the captured piece to list
+            self.captured.append(captured)
+            # capturing a king wins the game
+            if captured == WHITE | KING:
+                self.winner = "Black"
+            elif captured == BLACK | KING:
+                self.winner = "White"
+
+        self.bitboard.move(src, dst)
+
+        # change turn
+        self.turn["black"], self.turn["white"] = self.turn["white"], self.turn["black"]
+
+
+    def unmake_move(self):
+        # take back the last move made with make_move and return it
+        move, captured, winner, self.hash = self.history.pop()
+        src = move & 63
+        dst = move >> 6
+
+        self.bitboard.unmove(src, dst, captured)
+        piece = self.bitboard.board[src]
+        scores = PIECE_SCORES[piece]
+        self.score += scores[src] - scores[dst]
+        if piece & KIND == PAWN:
+            keys = PIECE_KEYS[piece]
+            self.pawn_hash ^= keys[src] ^ keys[dst]
+        if captured:
+            self.score += PIECE_SCORES[captured][dst]
+            if captured & KIND == PAWN:
+                self.pawn_hash ^= PIECE_KEYS[captured][dst]
+            self.captured.pop()
+        self.winner = winner
+
+        # change turn back
+        self.turn["black"], self.turn["white"] = self.turn["white"], self.turn["black"]
+        return move
+
+
+    # helper function to find diagonal moves
+    def diagonal_moves(self, positions, piece, piece_coord):
+        return self.slide(positions, piece_coord, DIAGONAL_STEPS)
+
+
+    # helper function to find horizontal and vertical moves
+    def linear_moves(self, positions, piece, piece_coord):
+        return self.slide(positions, piece_coord, LINEAR_STEPS)
+
+
+    # append the squares reached from piece_coord in each (dx, dy) direction
+    def slide(self, positions, piece_coord, steps):
+        board = self.bitboard.board
+        for dx, dy in steps:
+            # reset x and y coordinate values
+            x, y = piece_coord
+            while True:
+                x = x + dx
+                y = y + dy
+                if x < 0 or y < 0 or x > 7 or y > 7:
+                    break
+                positions.append([x, y])
+
+                # stop finding possible moves if blocked by a piece
+                if board[y * 8 + x]:
+                    break
+
+        return positions
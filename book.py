@@ -0,0 +1,135 @@
+import argparse
+import mmap
+import random
+import struct
+
+from board import Board
+from bitboard import COLOR_BITS, BLACK
+from record import GameRecordReader, MOVE_MASK
+
+# An opening book file is a header followed by entries sorted by position
+# hash and then move, so all moves of a position are next to each other:
+#   header  4 bytes magic b"BOOK", 4 bytes number of entries
+#   entry   8 bytes Zobrist hash, 2 bytes encoded move, 2 bytes weight
+# all little endian.
+BOOK_HEADER = struct.Struct("<4sI")
+BOOK_MAGIC = b"BOOK"
+BOOK_ENTRY = struct.Struct("<QHH")
+
+# plies of every game added to the book
+BOOK_PLIES = 16
+# weight of a move for each game it was played in, by the result for the
+# side that played it
+WIN_WEIGHT = 2
+DRAW_WEIGHT = 1
+LOSS_WEIGHT = 0
+
+
+def build_book(record_paths, path, plies=BOOK_PLIES, min_weight=1):
+    # write a book of the first plies of every game in the record files,
+    # returns the number of entries
+    weights = {}
+    board = Board()
+    for record_path in record_paths:
+        with GameRecordReader(record_path) as reader:
+            for first_player, winner, moves in reader:
+                board.reset(first_player)
+                for move in moves[:plies]:
+                    move &= MOVE_MASK
+                    mover = board.side_to_move()
+                    if winner == "Draw" or len(winner) == 0:
+                        weight = DRAW_WEIGHT
+                    elif winner.lower() == mover:
+                        weight = WIN_WEIGHT
+                    else:
+                        weight = LOSS_WEIGHT
+                    key = (board.hash, move)
+                    weights[key] = weights.get(key, 0) + weight
+                    board.make_move(move)
+
+    entries = sorted(key for key, weight in weights.items() if weight >= min_weight)
+    with open(path, "wb") as file:
+        file.write(BOOK_HEADER.pack(BOOK_MAGIC, len(entries)))
+        for key, move in entries:
+            file.write(BOOK_ENTRY.pack(key, move, min(weights[key, move], 0xFFFF)))
+    return len(entries)
+
+
+class OpeningBook(object):
+    """Moves of known positions, read from a book file through a memory map"""
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.size = BOOK_HEADER.unpack_from(self.map, 0)
+        if magic != BOOK_MAGIC:
+            raise ValueError("not an opening book: {}".format(path))
+
+    def entry(self, index):
+        return BOOK_ENTRY.unpack_from(self.map, BOOK_HEADER.size + index * BOOK_ENTRY.size)
+
+    def probe(self, key):
+        # list of (move, weight) of the position with the given hash
+        # binary search for the first entry of the position
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            if self.entry(middle)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        moves = []
+        while low < self.size:
+            entry_key, move, weight = self.entry(low)
+            if entry_key != key:
+                break
+            moves.append((move, weight))
+            low += 1
+        return moves
+
+    def choose(self, board, rng=random):
+        # book move of the side to move picked at random by weight, or None
+        # out of the book
+        bb = board.bitboard
+        turn = board.side_to_move()
+        moves = []
+        weights = []
+        for move, weight in self.probe(board.hash):
+            src = move & 63
+            piece = bb.board[src]
+            # skip moves of another position with the same hash
+            if (not piece or piece & BLACK != COLOR_BITS[turn] or
+                    not bb.legal_targets(piece, src) >> (move >> 6) & 1):
+                continue
+            moves.append(move)
+            weights.append(weight)
+        if not moves:
+            return None
+        if sum(weights) == 0:
+            return rng.choice(moves)
+        return rng.choices(moves, weights)[0]
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build an opening book from game record files")
+    parser.add_argument("book", help="book file to write")
+    parser.add_argument("records", nargs="+", help="game record files, see record.py")
+    parser.add_argument("--plies", type=int, default=BOOK_PLIES, help="plies of every game to add")
+    parser.add_argument("--min-weight", type=int, default=1,
+                        help="leave out moves with a lower total weight")
+    args = parser.parse_args()
+    entries = build_book(args.records, args.book, args.plies, args.min_weight)
+    print("{} entries written to {}".format(entries, args.book))
+
+
+if __name__ == "__main__":
+    main()
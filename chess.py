@@ -1,681 +1,320 @@
 import pygame
 from pygame.locals import *
-import random
 
 from piece import Piece
-from utils import Utils
+from utils import Utils, BoardInput
+from board import Board
+from bitboard import square, COLOR_BITS, BLACK
+from render_cache import RenderCache
 
 import time
 
+# highlight colors of selected black and white pieces
+TRANSPARENT_GREEN = (0,194,39,170)
+TRANSPARENT_BLUE = (28,21,212,170)
+
 class Chess(object):
-    def __init__(self, screen, pieces_src, square_coords, square_length):
+    def __init__(self, screen, pieces_src, square_coords, square_length, backend="bitboard",
+                 render_cache=None, board_img=None, sprite_set="pawns"):
         # display surface
         self.screen = screen
+        # fonts, labels and overlays reused between frames
+        self.render_cache = render_cache if render_cache is not None else RenderCache()
         # create an object of class to show chess pieces on the board
-        self.chess_pieces = Piece(pieces_src, cols=6, rows=2)
+        self.chess_pieces = Piece(pieces_src, cols=6, rows=2, sprite_set=sprite_set,
+                                  size=square_length)
         # store coordinates of the chess board squares
+        self.square_coords = square_coords
         self.board_locations = square_coords
         # length of the side of a chess board square
         self.square_length = square_length
-        # dictionary to keeping track of player turn
-        self.turn = {"black": 0,
-                     "white": 0}
+        # rules engine holding the board state
+        self.board = Board(backend)
 
         # list containing possible moves for the selected piece
         self.moves = []
+        # color played by the computer, None when two players take turns
+        self.computer = None
+
+        # board image, needed to redraw single squares with draw_dirty
+        self.board_img = board_img
+        # screen position of the top left corner of the board
+        self.board_offset = square_coords[0][0]
+        # cached board with pieces and highlights, kept up to date by draw_dirty
+        self.layer = pygame.Surface(board_img.get_size()) if board_img is not None else None
+        # what draw_dirty last drew, see invalidate
+        self.invalidate()
         #
         self.utils = Utils()
-
-        # mapping of piece names to index of list containing piece coordinates on spritesheet
-        self.pieces = {
-            "white_pawn":   5,
-            "white_knight": 3,
-            "white_bishop": 2,
-            "white_rook":   4,
-            "white_king":   0,
-            "white_queen":  1,
-            "black_pawn":   11,
-            "black_knight": 9,
-            "black_bishop": 8,
-            "black_rook":   10,
-            "black_king":   6,
-            "black_queen":  7
-        }
-
-        # list containing captured pieces
-        self.captured = []
-        #
-        self.winner = ""
+        # maps mouse positions to board squares
+        self.input = BoardInput(square_coords[0][0], square_length)
 
         self.reset()
     
     def reset(self):
         # clear moves lists
         self.moves = []
+        # reset the rules engine
+        self.board.reset()
+
+    # the board state lives in the rules engine, Chess only draws it
+    @property
+    def turn(self):
+        return self.board.turn
 
-        # randomize player turn
-        x = random.randint(0, 1)
-        if(x == 1):
-            self.turn["black"] = 1
-        elif(x == 0):
-            self.turn["white"] = 1
-
-        # two dimensonal dictionary containing details about each board location
-        # storage format is [piece_name, currently_selected, x_y_coordinate]
-        self.piece_location = {}
-        x = 0
-        for i in range(97, 105):
-            a = 8
-            y = 0
-            self.piece_location[chr(i)] = {}
-            while a>0:
-                # [piece name, currently selected, board coordinates]
-                self.piece_location[chr(i)][a] = ["", False, [x,y]]
-                a = a - 1
-                y = y + 1
-            x = x + 1
-
-        # reset the board
-        for i in range(97, 105):
-            x = 8
-            while x>0:
-                if(x==8):
-                    if(chr(i)=='a' or chr(i)=='h'):
-                        self.piece_location[chr(i)][x][0] = "black_rook"
-                    elif(chr(i)=='b' or chr(i)=='g'):
-                        self.piece_location[chr(i)][x][0] = "black_knight"
-                    elif(chr(i)=='c' or chr(i)=='f'):
-                        self.piece_location[chr(i)][x][0] = "black_bishop"
-                    elif(chr(i)=='d'):
-                        self.piece_location[chr(i)][x][0] = "black_queen"
-                    elif(chr(i)=='e'):
-                        self.piece_location[chr(i)][x][0] = "black_king"
-                elif(x==7):
-                    self.piece_location[chr(i)][x][0] = "black_pawn"
-                elif(x==2):
-                    self.piece_location[chr(i)][x][0] = "white_pawn"
-                elif(x==1):
-                    if(chr(i)=='a' or chr(i)=='h'):
-                        self.piece_location[chr(i)][x][0] = "white_rook"
-                    elif(chr(i)=='b' or chr(i)=='g'):
-                        self.piece_location[chr(i)][x][0] = "white_knight"
-                    elif(chr(i)=='c' or chr(i)=='f'):
-                        self.piece_location[chr(i)][x][0] = "white_bishop"
-                    elif(chr(i)=='d'):
-                        self.piece_location[chr(i)][x][0] = "white_queen"
-                    elif(chr(i)=='e'):
-                        self.piece_location[chr(i)][x][0] = "white_king"
-                x = x - 1
+    @property
+    def captured(self):
+        return self.board.captured
 
+    @property
+    def winner(self):
+        return self.board.winner
+
+    @winner.setter
+    def winner(self, winner):
+        self.board.winner = winner
 
     # 
     def play_turn(self):
+        # show whose turn it is
+        self.draw_turn()
+
+        self.handle_turn()
+
+    # show whose turn it is above the board
+    def draw_turn(self):
         # white color
         white_color = (255, 255, 255)
-        # create fonts for texts
-        small_font = pygame.font.SysFont("comicsansms", 20)
         # create text to be shown on the game menu
         if self.turn["black"]:
-            turn_text = small_font.render("Turn: Black", True, white_color)
+            turn_text = self.render_cache.text("Turn: Black", 20, white_color)
         elif self.turn["white"]:
-            turn_text = small_font.render("Turn: White", True, white_color)
+            turn_text = self.render_cache.text("Turn: White", 20, white_color)
         
         # show welcome text
         self.screen.blit(turn_text, 
                       ((self.screen.get_width() - turn_text.get_width()) // 2,
                       10))
-        
+
+    # let the player with the turn select and move pieces
+    # selected is the [x, y] square that was clicked, None to poll the mouse
+    def handle_turn(self, selected=None):
         # let player with black piece play
-        if(self.turn["black"]):
-            self.move_piece("black")
+        if(self.turn["black"]) and self.computer != "black":
+            self.move_piece("black", selected)
         # let player with white piece play
-        elif(self.turn["white"]):
-            self.move_piece("white")
+        elif(self.turn["white"]) and self.computer != "white":
+            self.move_piece("white", selected)
+
+    # play an encoded move for the side to move, as if it had been clicked
+    def play_move(self, move):
+        self.moves = []
+        x, y = (move >> 6) & 7, move >> 9
+        self.board.select(move & 63)
+        self.board.capture_piece(self.board.side_to_move(), [chr(97 + x), 8 - y], [x, y])
 
     # method to draw pieces on the chess board
     def draw_pieces(self):
-        transparent_green = (0,194,39,170)
-        transparent_blue = (28,21,212,170)
-
-        # create a transparent surface
-        surface = pygame.Surface((self.square_length, self.square_length), pygame.SRCALPHA)
-        surface.fill(transparent_green)
-
-        surface1 = pygame.Surface((self.square_length, self.square_length), pygame.SRCALPHA)
-        surface1.fill(transparent_blue)
-
-        # loop to change background color of selected piece
-        for val in self.piece_location.values():
-            for value in val.values() :
-                # name of the piece in the current location
-                piece_name = value[0]
-                # x, y coordinates of the current piece
-                piece_coord_x, piece_coord_y = value[2]
-
-                # change background color of piece if it is selected
-                if value[1] and len(value[0]) > 5:
-                    # if the piece selected is a black piece
-                    if value[0][:5] == "black":
-                        self.screen.blit(surface, self.board_locations[piece_coord_x][piece_coord_y])
-                        if len(self.moves) > 0:
-                            for move in self.moves:
-                                x_coord = move[0]
-                                y_coord = move[1]
-                                if x_coord >= 0 and y_coord >= 0 and x_coord < 8 and y_coord < 8:
-                                    self.screen.blit(surface, self.board_locations[x_coord][y_coord])
-                    # if the piece selected is a white piece
-                    elif value[0][:5] == "white":
-                        self.screen.blit(surface1, self.board_locations[piece_coord_x][piece_coord_y])
-                        if len(self.moves) > 0:
-                            for move in self.moves:
-                                x_coord = move[0]
-                                y_coord = move[1]
-                                if x_coord >= 0 and y_coord >= 0 and x_coord < 8 and y_coord < 8:
-                                    self.screen.blit(surface1, self.board_locations[x_coord][y_coord])
-        
-        # draw all chess pieces
-        for val in self.piece_location.values():
-            for value in val.values() :
-                # name of the piece in the current location
-                piece_name = value[0]
-                # x, y coordinates of the current piece
-                piece_coord_x, piece_coord_y = value[2]
-                # check if there is a piece at the square
-                if(len(value[0]) > 1):
-                    # draw piece on the board
-                    self.chess_pieces.draw(self.screen, piece_name, 
-                                            self.board_locations[piece_coord_x][piece_coord_y])
-
+        transparent_green = TRANSPARENT_GREEN
+        transparent_blue = TRANSPARENT_BLUE
+
+        # transparent surfaces to highlight squares
+        size = (self.square_length, self.square_length)
+        surface = self.render_cache.overlay(transparent_green, size)
+        surface1 = self.render_cache.overlay(transparent_blue, size)
+
+        # change background color of the selected piece and its moves
+        for sq, color in self.highlighted_squares().items():
+            overlay = surface if color == transparent_green else surface1
+            self.screen.blit(overlay, self.board_locations[sq & 7][sq >> 3])
+
+        # draw all chess pieces, visiting only the occupied squares
+        board = self.board.bitboard.board
+        for squares in self.board.bitboard.piece_lists.values():
+            for sq in squares:
+                self.chess_pieces.draw(self.screen, board[sq], self.board_locations[sq & 7][sq >> 3])
+
+
+    # squares to highlight, as {bit index: overlay color}
+    def highlighted_squares(self):
+        highlights = {}
+        selected = self.board.selected
+        if selected is not None:
+            piece = self.board.bitboard.board[selected]
+            # the selected square and the possible moves of its piece
+            if piece:
+                color = TRANSPARENT_GREEN if piece & BLACK else TRANSPARENT_BLUE
+                highlights[selected] = color
+                for x_coord, y_coord in self.moves:
+                    if x_coord >= 0 and y_coord >= 0 and x_coord < 8 and y_coord < 8:
+                        highlights[square(x_coord, y_coord)] = color
+        return highlights
+
+    # forget what draw_dirty has drawn so the next call redraws everything
+    def invalidate(self):
+        # piece codes, hash, highlights and turn as last drawn
+        self.drawn_pieces = None
+        self.drawn_hash = None
+        self.drawn_highlights = {}
+        self.drawn_turn = None
+
+    # draw only the squares that changed since the last call
+    # returns the list of screen rects that need to be updated
+    def draw_dirty(self):
+        pieces = self.board.bitboard.board
+        highlights = self.highlighted_squares()
+        length = self.square_length
+        offset_x, offset_y = self.board_offset
+        rects = []
+
+        if self.drawn_pieces is None:
+            # draw the whole screen after invalidate()
+            self.screen.fill((0, 0, 0))
+            dirty = range(64)
+        else:
+            dirty = set()
+            # squares where a piece moved, appeared or disappeared
+            if self.board.hash != self.drawn_hash:
+                drawn = self.drawn_pieces
+                for sq in range(64):
+                    if pieces[sq] != drawn[sq]:
+                        dirty.add(sq)
+            # squares where a highlight was added, removed or changed color
+            for sq in highlights.keys() | self.drawn_highlights.keys():
+                if highlights.get(sq) != self.drawn_highlights.get(sq):
+                    dirty.add(sq)
+
+        for sq in dirty:
+            left, top = self.board_locations[sq & 7][sq >> 3]
+            # area of the square on the cached layer
+            area = pygame.Rect(left - offset_x, top - offset_y, length, length)
+            # keep pieces from spilling onto neighbouring squares
+            self.layer.set_clip(area)
+            self.layer.blit(self.board_img, area, area)
+            if sq in highlights:
+                self.layer.blit(self.render_cache.overlay(highlights[sq], (length, length)), area)
+            if pieces[sq]:
+                self.chess_pieces.draw(self.layer, pieces[sq], area.topleft)
+            self.screen.blit(self.layer, (left, top), area)
+            rects.append(pygame.Rect(left, top, length, length))
+        self.layer.set_clip(None)
+
+        # turn text above the board
+        turn = self.board.side_to_move()
+        if turn != self.drawn_turn:
+            strip = pygame.Rect(0, 0, self.screen.get_width(), offset_y)
+            self.screen.fill((0, 0, 0), strip)
+            turn_text = self.render_cache.text("Turn: " + turn.capitalize(), 20, (255, 255, 255))
+            self.screen.blit(turn_text, ((self.screen.get_width() - turn_text.get_width()) // 2, 10))
+            rects.append(strip)
+
+        if self.drawn_pieces is None:
+            rects = [self.screen.get_rect()]
+        self.drawn_pieces = bytes(pieces)
+        self.drawn_hash = self.board.hash
+        self.drawn_highlights = highlights
+        self.drawn_turn = turn
+        return rects
+
+
+    # select the piece of an encoded move and highlight only its destination,
+    # clicking the destination then plays the move
+    def show_hint(self, move):
+        self.board.select(move & 63)
+        self.moves = [[(move >> 6) & 7, move >> 9]]
 
     # method to find the possible moves of the selected piece
-    def possible_moves(self, piece_name, piece_coord):
-        # list to store possible moves of the selected piece
-        positions = []
-        # find the possible locations to put a piece
-        if len(piece_name) > 0:
-            # get x, y coordinate
-            x_coord, y_coord = piece_coord
-            # calculate moves for bishop
-            if piece_name[6:] == "bishop":
-                positions = self.diagonal_moves(positions, piece_name, piece_coord)
-            
-            # calculate moves for pawn
-            elif piece_name[6:] == "pawn":
-                # convert list index to dictionary key
-                columnChar = chr(97 + x_coord)
-                rowNo = 8 - y_coord
-
-                # calculate moves for white pawn
-                if piece_name == "black_pawn":
-                    if y_coord + 1 < 8:
-                        # get row in front of black pawn
-                        rowNo = rowNo - 1
-                        front_piece = self.piece_location[columnChar][rowNo][0]
-                
-                        # pawns cannot move when blocked by another another pawn
-                        if(front_piece[6:] != "pawn"):
-                            positions.append([x_coord, y_coord+1])
-                            # black pawns can move two positions ahead for first move
-                            if y_coord < 2:
-                                positions.append([x_coord, y_coord+2])
-
-                        # EM PASSANT
-                        # diagonal to the left
-                        if x_coord - 1 >= 0 and y_coord + 1 < 8:
-                            x = x_coord - 1
-                            y = y_coord + 1
-                            
-                            # convert list index to dictionary key
-                            columnChar = chr(97 + x)
-                            rowNo = 8 - y
-                            to_capture = self.piece_location[columnChar][rowNo]
-
-                            if(to_capture[0][:5] == "white"):
-                                positions.append([x, y])
-                        
-                        # diagonal to the right
-                        if x_coord + 1 < 8  and y_coord + 1 < 8:
-                            x = x_coord + 1
-                            y = y_coord + 1
-
-                            # convert list index to dictionary key
-                            columnChar = chr(97 + x)
-                            rowNo = 8 - y
-                            to_capture = self.piece_location[columnChar][rowNo]
-
-                            if(to_capture[0][:5] == "white"):
-                                positions.append([x, y])
-                        
-                # calculate moves for white pawn
-                elif piece_name == "white_pawn":
-                    if y_coord - 1 >= 0:
-                        # get row in front of black pawn
-                        rowNo = rowNo + 1
-                        front_piece = self.piece_location[columnChar][rowNo][0]
-
-                        # pawns cannot move when blocked by another another pawn
-                        if(front_piece[6:] != "pawn"):
-                            positions.append([x_coord, y_coord-1])
-                            # black pawns can move two positions ahead for first move
-                            if y_coord > 5:
-                                positions.append([x_coord, y_coord-2])
-
-                        # EM PASSANT
-                        # diagonal to the left
-                        if x_coord - 1 >= 0 and y_coord - 1 >= 0:
-                            x = x_coord - 1
-                            y = y_coord - 1
-                            
-                            # convert list index to dictionary key
-                            columnChar = chr(97 + x)
-                            rowNo = 8 - y
-                            to_capture = self.piece_location[columnChar][rowNo]
-
-                            if(to_capture[0][:5] == "black"):
-                                positions.append([x, y])
-
-                            
-                        # diagonal to the right
-                        if x_coord + 1 < 8  and y_coord - 1 >= 0:
-                            x = x_coord + 1
-                            y = y_coord - 1
-
-                            # convert list index to dictionary key
-                            columnChar = chr(97 + x)
-                            rowNo = 8 - y
-                            to_capture = self.piece_location[columnChar][rowNo]
-
-                            if(to_capture[0][:5] == "black"):
-                                positions.append([x, y])
-
-
-            # calculate moves for rook
-            elif piece_name[6:] == "rook":
-                # find linear moves
-                positions = self.linear_moves(positions, piece_name, piece_coord)
-
-            # calculate moves for knight
-            elif piece_name[6:] == "knight":
-                # left positions
-                if(x_coord - 2) >= 0:
-                    if(y_coord - 1) >= 0:
-                        positions.append([x_coord-2, y_coord-1])
-                    if(y_coord + 1) < 8:
-                        positions.append([x_coord-2, y_coord+1])
-                # top positions
-                if(y_coord - 2) >= 0:
-                    if(x_coord - 1) >= 0:
-                        positions.append([x_coord-1, y_coord-2])
-                    if(x_coord + 1) < 8:
-                        positions.append([x_coord+1, y_coord-2])
-                # right positions
-                if(x_coord + 2) < 8:
-                    if(y_coord - 1) >= 0:
-                        positions.append([x_coord+2, y_coord-1])
-                    if(y_coord + 1) < 8:
-                        positions.append([x_coord+2, y_coord+1])
-                # bottom positions
-                if(y_coord + 2) < 8:
-                    if(x_coord - 1) >= 0:
-                        positions.append([x_coord-1, y_coord+2])
-                    if(x_coord + 1) < 8:
-                        positions.append([x_coord+1, y_coord+2])
-
-            # calculate movs for king
-            elif piece_name[6:] == "king":
-                if(y_coord - 1) >= 0:
-                    # top spot
-                    positions.append([x_coord, y_coord-1])
-
-                if(y_coord + 1) < 8:
-                    # bottom spot
-                    positions.append([x_coord, y_coord+1])
-
-                if(x_coord - 1) >= 0:
-                    # left spot
-                    positions.append([x_coord-1, y_coord])
-                    # top left spot
-                    if(y_coord - 1) >= 0:
-                        positions.append([x_coord-1, y_coord-1])
-                    # bottom left spot
-                    if(y_coord + 1) < 8:
-                        positions.append([x_coord-1, y_coord+1])
-                    
-                if(x_coord + 1) < 8:
-                    # right spot
-                    positions.append([x_coord+1, y_coord])
-                    # top right spot
-                    if(y_coord - 1) >= 0:
-                        positions.append([x_coord+1, y_coord-1])
-                    # bottom right spot
-                    if(y_coord + 1) < 8:
-                        positions.append([x_coord+1, y_coord+1])
-                
-            # calculate movs for queen
-            elif piece_name[6:] == "queen":
-                # find diagonal positions
-                positions = self.diagonal_moves(positions, piece_name, piece_coord)
-
-                # find linear moves
-                positions = self.linear_moves(positions, piece_name, piece_coord)
-
-            # list of positions to be removed
-            to_remove = []
-
-            # remove positions that overlap other pieces of the current player
-            for pos in positions:
-                x, y = pos
+    def possible_moves(self, piece, piece_coord):
+        return self.board.possible_moves(piece, piece_coord)
 
-                # convert list index to dictionary key
-                columnChar = chr(97 + x)
-                rowNo = 8 - y
+    # every legal move of the side to move, as encoded moves
+    def legal_moves(self):
+        return self.board.legal_moves()
 
-                # find the pieces to remove
-                des_piece_name = self.piece_location[columnChar][rowNo][0]
-                if(des_piece_name[:5] == piece_name[:5]):
-                    to_remove.append(pos)
 
-            # remove position from positions list
-            for i in to_remove:
-                positions.remove(i)
-
-        # return list containing possible moves for the selected piece
-        return positions
-
-
-    def move_piece(self, turn):
+    def move_piece(self, turn, selected=None):
         # get the coordinates of the square selected on the board
-        square = self.get_selected_square()
+        if selected is None:
+            selected_square = self.get_selected_square()
+        else:
+            selected_square = self.square_details(selected)
 
         # if a square was selected
-        if square:
-            # get name of piece on the selected square
-            piece_name = square[0]
-            # color of piece on the selected square
-            piece_color = piece_name[:5]
+        if selected_square:
+            # get the piece on the selected square
+            piece = selected_square[0]
             # board column character
-            columnChar = square[1]
+            columnChar = selected_square[1]
             # board row number
-            rowNo = square[2]
+            rowNo = selected_square[2]
 
             # get x, y coordinates
-            x, y = self.piece_location[columnChar][rowNo][2]
+            x, y = ord(columnChar) - 97, 8 - rowNo
+            # the piece belongs to the player with the turn
+            own = piece != 0 and piece & BLACK == COLOR_BITS[turn]
 
             # if there's a piece on the selected square
-            if(len(piece_name) > 0) and (piece_color == turn):
+            if own:
                 # find possible moves for thr piece
-                self.moves = self.possible_moves(piece_name, [x,y])
-
-            # checkmate mechanism
-            p = self.piece_location[columnChar][rowNo]
+                self.moves = self.possible_moves(piece, [x,y])
 
             for i in self.moves:
                 if i == [x, y]:
-                    if(p[0][:5] == turn) or len(p[0]) == 0:
+                    if own or piece == 0:
                         self.validate_move([x,y])
                     else:
                         self.capture_piece(turn, [columnChar, rowNo], [x,y])
 
             # only the player with the turn gets to play
-            if(piece_color == turn):
-                # change selection flag from all other pieces
-                for k in self.piece_location.keys():
-                    for key in self.piece_location[k].keys():
-                        self.piece_location[k][key][1] = False
-
-                # change selection flag of the selected piece
-                self.piece_location[columnChar][rowNo][1] = True
+            if own:
+                # move the selection flag to the selected piece
+                self.board.select(square(x, y))
                 
             
-    def get_selected_square(self):
-        # get left event
-        left_click = self.utils.left_click_event()
-
-        # if there's a mouse event
-        if left_click:
-            # get mouse event
-            mouse_event = self.utils.get_mouse_event()
-
-            for i in range(len(self.board_locations)):
-                for j in range(len(self.board_locations)):
-                    rect = pygame.Rect(self.board_locations[i][j][0], self.board_locations[i][j][1], 
-                            self.square_length, self.square_length)
-                    collision = rect.collidepoint(mouse_event[0], mouse_event[1])
-                    if collision:
-                        selected = [rect.x, rect.y]
-                        # find x, y coordinates the selected square
-                        for k in range(len(self.board_locations)):
-                            #
-                            try:
-                                l = None
-                                l = self.board_locations[k].index(selected)
-                                if l != None:
-                                    #reset color of all selected pieces
-                                    for val in self.piece_location.values():
-                                        for value in val.values() :
-                                            # [piece name, currently selected, board coordinates]
-                                            if not value[1]:
-                                                value[1] = False
-
-                                    # get column character and row number of the chess piece
-                                    columnChar = chr(97 + k)
-                                    rowNo = 8 - l
-                                    # get the name of the 
-                                    piece_name = self.piece_location[columnChar][rowNo][0]
-                                    
-                                    return [piece_name, columnChar, rowNo]
-                            except:
-                                pass
-        else:
+    def get_selected_square(self, pos=None):
+        # use the current mouse position while the left button is down
+        if pos is None:
+            if not self.utils.left_click_event():
+                return None
+            pos = self.utils.get_mouse_event()
+
+        # find x, y coordinates of the square under the mouse
+        selected = self.input.square_at(pos)
+        if selected is None:
             return None
+        return self.square_details(selected)
+
+    # [piece code, column character, row number] of the [x, y] square
+    def square_details(self, selected):
+        x, y = selected
+
+        # get column character and row number of the chess piece
+        columnChar = chr(97 + x)
+        rowNo = 8 - y
+        # get the piece on the square
+        piece = self.board.bitboard.board[square(x, y)]
+
+        return [piece, columnChar, rowNo]
+
+    # show the board from black's side when flipped is True
+    def set_flipped(self, flipped):
+        self.input.flipped = flipped
+        # screen position of every [x, y] board coordinate
+        self.board_locations = []
+        for x in range(8):
+            self.board_locations.append([])
+            for y in range(8):
+                if flipped:
+                    self.board_locations[x].append(self.square_coords[7 - x][7 - y])
+                else:
+                    self.board_locations[x].append(self.square_coords[x][y])
+        # everything moved, redraw it all
+        self.invalidate()
 
 
     def capture_piece(self, turn, chess_board_coord, piece_coord):
-        # get x, y coordinate of the destination piece
-        x, y = piece_coord
-
-        # get chess board coordinate
-        columnChar, rowNo = chess_board_coord
-
-        p = self.piece_location[columnChar][rowNo]
-        
-        if p[0] == "white_king":
-            self.winner = "Black"
-            print("Black wins")
-        elif p[0] == "black_king":
-            self.winner = "White"
-            print("White wins")
-
-        # add the captured piece to list
-        self.captured.append(p)
-        # move source piece to its destination
-        self.validate_move(piece_coord)
+        self.board.capture_piece(turn, chess_board_coord, piece_coord)
 
 
     def validate_move(self, destination):
-        desColChar = chr(97 + destination[0])
-        desRowNo = 8 - destination[1]
-
-        for k in self.piece_location.keys():
-            for key in self.piece_location[k].keys():
-                board_piece = self.piece_location[k][key]
-
-                if board_piece[1]:
-                    # unselect the source piece
-                    self.piece_location[k][key][1] = False
-                    # get the name of the source piece
-                    piece_name = self.piece_location[k][key][0]
-                    # move the source piece to the destination piece
-                    self.piece_location[desColChar][desRowNo][0] = piece_name
-                    
-                    src_name = self.piece_location[k][key][0]
-                    # remove source piece from its current position
-                    self.piece_location[k][key][0] = ""
-
-                    # change turn
-                    if(self.turn["black"]):
-                        self.turn["black"] = 0
-                        self.turn["white"] = 1
-                    elif("white"):
-                        self.turn["black"] = 1
-                        self.turn["white"] = 0
-
-                    src_location = k + str(key)
-                    des_location = desColChar + str(desRowNo)
-                    print("{} moved from {} to {}".format(src_name,  src_location, des_location))
-
-
-    # helper function to find diagonal moves
-    def diagonal_moves(self, positions, piece_name, piece_coord):
-        # reset x and y coordinate values
-        x, y = piece_coord
-        # find top left diagonal spots
-        while(True):
-            x = x - 1
-            y = y - 1
-            if(x < 0 or y < 0):
-                break
-            else:
-                positions.append([x,y])
-
-            # convert list index to dictionary key
-            columnChar = chr(97 + x)
-            rowNo = 8 - y
-            p = self.piece_location[columnChar][rowNo]
-
-            # stop finding possible moves if blocked by a piece
-            if len(p[0]) > 0 and piece_name[:5] != p[:5]:
-                break
-
-        # reset x and y coordinate values
-        x, y = piece_coord
-        # find bottom right diagonal spots
-        while(True):
-            x = x + 1
-            y = y + 1
-            if(x > 7 or y > 7):
-                break
-            else:
-                positions.append([x,y])
-
-            # convert list index to dictionary key
-            columnChar = chr(97 + x)
-            rowNo = 8 - y
-            p = self.piece_location[columnChar][rowNo]
-
-            # stop finding possible moves if blocked by a piece
-            if len(p[0]) > 0 and piece_name[:5] != p[:5]:
-                break
-
-        # reset x and y coordinate values
-        x, y = piece_coord
-        # find bottom left diagonal spots
-        while(True):
-            x = x - 1
-            y = y + 1
-            if (x < 0 or y > 7):
-                break
-            else:
-                positions.append([x,y])
-
-            # convert list index to dictionary key
-            columnChar = chr(97 + x)
-            rowNo = 8 - y
-            p = self.piece_location[columnChar][rowNo]
-
-            # stop finding possible moves if blocked by a piece
-            if len(p[0]) > 0 and piece_name[:5] != p[:5]:
-                break
-
-        # reset x and y coordinate values
-        x, y = piece_coord
-        # find top right diagonal spots
-        while(True):
-            x = x + 1
-            y = y - 1
-            if(x > 7 or y < 0):
-                break
-            else:
-                positions.append([x,y])
-
-            # convert list index to dictionary key
-            columnChar = chr(97 + x)
-            rowNo = 8 - y
-            p = self.piece_location[columnChar][rowNo]
-
-            # stop finding possible moves if blocked by a piece
-            if len(p[0]) > 0 and piece_name[:5] != p[:5]:
-                break
-
-        return positions
-    
-
-    # helper function to find horizontal and vertical moves
-    def linear_moves(self, positions, piece_name, piece_coord):
-        # reset x, y coordniate value
-        x, y = piece_coord
-        # horizontal moves to the left
-        while(x > 0):
-            x = x - 1
-            positions.append([x,y])
-
-            # convert list index to dictionary key
-            columnChar = chr(97 + x)
-            rowNo = 8 - y
-            p = self.piece_location[columnChar][rowNo]
-
-            # stop finding possible moves if blocked by a piece
-            if len(p[0]) > 0 and piece_name[:5] != p[:5]:
-                break
-                    
-
-        # reset x, y coordniate value
-        x, y = piece_coord
-        # horizontal moves to the right
-        while(x < 7):
-            x = x + 1
-            positions.append([x,y])
-
-            # convert list index to dictionary key
-            columnChar = chr(97 + x)
-            rowNo = 8 - y
-            p = self.piece_location[columnChar][rowNo]
-
-            # stop finding possible moves if blocked by a piece
-            if len(p[0]) > 0 and piece_name[:5] != p[:5]:
-                break    
-
-        # reset x, y coordniate value
-        x, y = piece_coord
-        # vertical moves upwards
-        while(y > 0):
-            y = y - 1
-            positions.append([x,y])
-
-            # convert list index to dictionary key
-            columnChar = chr(97 + x)
-            rowNo = 8 - y
-            p = self.piece_location[columnChar][rowNo]
-
-            # stop finding possible moves if blocked by a piece
-            if len(p[0]) > 0 and piece_name[:5] != p[:5]:
-                break
-
-        # reset x, y coordniate value
-        x, y = piece_coord
-        # vertical moves downwards
-        while(y < 7):
-            y = y + 1
-            positions.append([x,y])
-
-            # convert list index to dictionary key
-            columnChar = chr(97 + x)
-            rowNo = 8 - y
-            p = self.piece_location[columnChar][rowNo]
-
-            # stop finding possible moves if blocked by a piece
-            if len(p[0]) > 0 and piece_name[:5] != p[:5]:
-                break
-
-
-        return positions
\ No newline at end of file
+        self.board.validate_move(destination)
@@ -0,0 +1,56 @@
+import queue
+import socket
+import threading
+
+from server import PORT
+
+
+class NetworkClient(object):
+    """Line protocol connection to a game server, see server.py
+
+    A background thread reads the server's messages so the game loop can
+    poll them without blocking."""
+    def __init__(self, host="127.0.0.1", port=PORT, notify=None):
+        self.socket = socket.create_connection((host, port))
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # messages from the server as lists of words, None once disconnected
+        self.messages = queue.Queue()
+        # called from the reader thread after every message, e.g. to wake up
+        # a loop waiting for events
+        self.notify = notify
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        with self.socket.makefile("r", encoding="utf-8", errors="replace") as lines:
+            try:
+                for line in lines:
+                    words = line.split()
+                    if words:
+                        self.messages.put(words)
+                        if self.notify is not None:
+                            self.notify()
+            except OSError:
+                pass
+        self.messages.put(None)
+        if self.notify is not None:
+            self.notify()
+
+    def send(self, *words):
+        self.socket.sendall((" ".join(words) + "\n").encode())
+
+    def poll(self):
+        # messages received since the last call
+        messages = []
+        while True:
+            try:
+                messages.append(self.messages.get_nowait())
+            except queue.Empty:
+                return messages
+
+    def close(self):
+        try:
+            self.socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.socket.close()
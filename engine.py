@@ -0,0 +1,243 @@
+import time
+
+from bitboard import KIND
+from evaluation import KIND_VALUES, PawnTable
+from transposition import TranspositionTable, EXACT, LOWER, UPPER
+from tablebase import WIN, LOSS
+
+# score of a won game, the game is won by checkmate
+MATE = 100000
+INFINITY = MATE + 1
+# how often the clock is checked, in nodes
+CHECK_EVERY = 256
+
+
+def to_table(score, ply):
+    # store won and lost scores as distance from the stored position
+    if score > MATE - 1000:
+        return score + ply
+    if score < -(MATE - 1000):
+        return score - ply
+    return score
+
+
+def from_table(score, ply):
+    if score > MATE - 1000:
+        return score - ply
+    if score < -(MATE - 1000):
+        return score + ply
+    return score
+
+
+class SearchAborted(Exception):
+    """Raised inside the search when the time or node budget runs out"""
+
+
+class Engine(object):
+    """Negamax alpha-beta search with iterative deepening"""
+    def __init__(self, time_limit=0.15, node_limit=None, max_depth=32, tt_megabytes=16, book=None,
+                 tablebases=None, pawn_megabytes=1):
+        # budget for one move, in seconds and in nodes
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.max_depth = max_depth
+        self.table = TranspositionTable(tt_megabytes)
+        # pawn structure scores, kept between searches
+        self.pawn_table = PawnTable(pawn_megabytes)
+        # optional book.OpeningBook consulted before searching
+        self.book = book
+        # optional tablebase.Tablebases with exact results of small endgames
+        self.tablebases = tablebases
+        # statistics of the last search
+        self.info = {}
+
+    def evaluate(self, board):
+        # material, square bonus and pawn structure from the point of view of
+        # the side to move; the first two are kept up to date by the board
+        score = board.score + self.pawn_table.score(board.pawn_hash, board.bitboard.pieces)
+        return score if board.turn["white"] else -score
+
+    def order_moves(self, board, moves, ply, best_move):
+        # best move from the table first, then captures of the most valuable
+        # piece by the least valuable one, then killer and history moves
+        bb = board.bitboard.board
+        killers = self.killers[ply]
+
+        def score(move):
+            if move == best_move:
+                return 1 << 30
+            victim = bb[move >> 6]
+            if victim:
+                return (1 << 20) + KIND_VALUES[victim & KIND] * 16 - KIND_VALUES[bb[move & 63] & KIND] // 64
+            if move in killers:
+                return 1 << 19
+            return self.history[move]
+
+        moves.sort(key=score, reverse=True)
+        return moves
+
+    def search(self, board, stop=None, report=None):
+        # find the best move for the side to move within the budget
+        # stop is an optional threading.Event that cancels the search, and
+        # report(move, info) is called after every completed iteration
+        self.stop = stop
+        self.start = time.perf_counter()
+        self.nodes = 0
+        self.killers = [[0, 0] for _ in range(self.max_depth + 1)]
+        self.history = [0] * 4096
+        self.table.new_search()
+
+        # no need to search positions in the opening book
+        if self.book is not None:
+            move = self.book.choose(board)
+            if move is not None:
+                self.info = self.statistics(0, 0)
+                return move
+
+        # best move found by the last completed iteration
+        self.root_move = None
+        best_move = None
+        best_score = 0
+        depth = 0
+        for depth in range(1, self.max_depth + 1):
+            try:
+                score = self.negamax(board, depth, -INFINITY, INFINITY, 0)
+            except SearchAborted:
+                depth -= 1
+                break
+            best_move = self.root_move
+            best_score = score
+            if report is not None:
+                report(best_move, self.statistics(depth, best_score))
+            # no point searching deeper once a forced win or loss is found
+            if abs(score) >= MATE - self.max_depth:
+                break
+            if self.time_limit is not None and time.perf_counter() - self.start > self.time_limit / 2:
+                break
+
+        # fall back to any move if not even depth one finished
+        if best_move is None:
+            moves = board.legal_moves()
+            best_move = moves[0] if moves else None
+
+        self.info = self.statistics(depth, best_score)
+        return best_move
+
+    def statistics(self, depth, score):
+        elapsed = time.perf_counter() - self.start
+        return {
+            "depth": depth,
+            "score": score,
+            "nodes": self.nodes,
+            "time": elapsed,
+            "nps": self.nodes / elapsed if elapsed > 0 else 0.0,
+        }
+
+    def check_budget(self):
+        if self.stop is not None and self.stop.is_set():
+            raise SearchAborted()
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            raise SearchAborted()
+        if self.time_limit is not None and time.perf_counter() - self.start >= self.time_limit:
+            raise SearchAborted()
+
+    def negamax(self, board, depth, alpha, beta, ply):
+        self.nodes += 1
+        if self.nodes % CHECK_EVERY == 0:
+            self.check_budget()
+
+        # the previous move captured our king, only possible in positions set
+        # up with the side not to move in check
+        if len(board.winner) > 0:
+            return 0 if board.winner == "Draw" else -(MATE - ply)
+        # exact result of positions in the endgame tables, dtm plies from here
+        if self.tablebases is not None and ply > 0:
+            result = self.tablebases.probe(board)
+            if result is not None:
+                wdl, dtm = result
+                if wdl == WIN:
+                    return MATE - ply - dtm
+                if wdl == LOSS:
+                    return -(MATE - ply - dtm)
+                return 0
+        if depth <= 0:
+            return self.quiescence(board, alpha, beta, ply)
+
+        alpha_start = alpha
+        best_move = 0
+        entry = self.table.probe(board.hash)
+        if entry is not None:
+            entry_depth, entry_score, flag, best_move = entry
+            entry_score = from_table(entry_score, ply)
+            if entry_depth >= depth and ply > 0:
+                if flag == EXACT:
+                    return entry_score
+                if flag == LOWER and entry_score >= beta:
+                    return entry_score
+                if flag == UPPER and entry_score <= alpha:
+                    return entry_score
+
+        moves = board.legal_moves()
+        if not moves:
+            # checkmate or stalemate
+            return -(MATE - ply) if board.in_check() else 0
+        self.order_moves(board, moves, ply, best_move)
+
+        best_score = -INFINITY
+        for move in moves:
+            capture = board.bitboard.board[move >> 6] != 0
+            board.make_move(move)
+            try:
+                score = -self.negamax(board, depth - 1, -beta, -alpha, ply + 1)
+            finally:
+                board.unmake_move()
+            if score > best_score:
+                best_score = score
+                best_move = move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                # remember quiet moves that caused a cutoff
+                if not capture:
+                    killers = self.killers[ply]
+                    if killers[0] != move:
+                        killers[1] = killers[0]
+                        killers[0] = move
+                    self.history[move] += depth * depth
+                break
+
+        if best_score <= alpha_start:
+            flag = UPPER
+        elif best_score >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.table.store(board.hash, depth, to_table(best_score, ply), flag, best_move)
+        if ply == 0:
+            self.root_move = best_move
+        return best_score
+
+    def quiescence(self, board, alpha, beta, ply):
+        # only search captures so the evaluation is not taken mid-exchange
+        score = self.evaluate(board)
+        if score >= beta:
+            return score
+        if score > alpha:
+            alpha = score
+
+        # captures come most valuable victim first, and the rest of them are
+        # not generated after a cutoff
+        for move in board.iter_legal_moves(captures_only=True):
+            self.nodes += 1
+            if self.nodes % CHECK_EVERY == 0:
+                self.check_budget()
+            board.make_move(move)
+            try:
+                score = -self.quiescence(board, -beta, -alpha, ply + 1)
+            finally:
+                board.unmake_move()
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+        return alpha
@@ -0,0 +1,162 @@
+# Evaluation terms kept up to date while moves are made.
+#
+# Board keeps the material and piece-square score of the position as a running
+# total, adding and removing PIECE_SCORES entries as pieces move, so reading it
+# costs nothing. The pawn structure only changes when a pawn moves or is
+# captured; it is computed from the pawn bitboards and cached in a PawnTable
+# keyed by the Zobrist hash of the pawns alone. All scores are from white's
+# point of view.
+
+from array import array
+
+from bitboard import PIECE_TYPES, PIECE_CODES, A_FILE, PAWN, WHITE, BLACK
+
+# material value of each piece type
+PIECE_VALUES = {
+    "pawn": 100,
+    "knight": 320,
+    "bishop": 330,
+    "rook": 500,
+    "queen": 900,
+    "king": 20000,
+}
+# material value of each piece code & KIND, see bitboard.py
+KIND_VALUES = [0] + [PIECE_VALUES[kind] for kind in PIECE_TYPES]
+
+# bonus of a white piece on each square, the first row is row 8 as in the
+# board's bit index; black uses the same tables flipped top to bottom
+PIECE_SQUARE_TABLES = {
+    "pawn": (
+        0, 0, 0, 0, 0, 0, 0, 0,
+        50, 50, 50, 50, 50, 50, 50, 50,
+        10, 10, 20, 30, 30, 20, 10, 10,
+        5, 5, 10, 25, 25, 10, 5, 5,
+        0, 0, 0, 20, 20, 0, 0, 0,
+        5, -5, -10, 0, 0, -10, -5, 5,
+        5, 10, 10, -20, -20, 10, 10, 5,
+        0, 0, 0, 0, 0, 0, 0, 0),
+    "knight": (
+        -50, -40, -30, -30, -30, -30, -40, -50,
+        -40, -20, 0, 0, 0, 0, -20, -40,
+        -30, 0, 10, 15, 15, 10, 0, -30,
+        -30, 5, 15, 20, 20, 15, 5, -30,
+        -30, 0, 15, 20, 20, 15, 0, -30,
+        -30, 5, 10, 15, 15, 10, 5, -30,
+        -40, -20, 0, 5, 5, 0, -20, -40,
+        -50, -40, -30, -30, -30, -30, -40, -50),
+    "bishop": (
+        -20, -10, -10, -10, -10, -10, -10, -20,
+        -10, 0, 0, 0, 0, 0, 0, -10,
+        -10, 0, 5, 10, 10, 5, 0, -10,
+        -10, 5, 5, 10, 10, 5, 5, -10,
+        -10, 0, 10, 10, 10, 10, 0, -10,
+        -10, 10, 10, 10, 10, 10, 10, -10,
+        -10, 5, 0, 0, 0, 0, 5, -10,
+        -20, -10, -10, -10, -10, -10, -10, -20),
+    "rook": (
+        0, 0, 0, 0, 0, 0, 0, 0,
+        5, 10, 10, 10, 10, 10, 10, 5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        0, 0, 0, 5, 5, 0, 0, 0),
+    "queen": (
+        -20, -10, -10, -5, -5, -10, -10, -20,
+        -10, 0, 0, 0, 0, 0, 0, -10,
+        -10, 0, 5, 5, 5, 5, 0, -10,
+        -5, 0, 5, 5, 5, 5, 0, -5,
+        0, 0, 5, 5, 5, 5, 0, -5,
+        -10, 5, 5, 5, 5, 5, 0, -10,
+        -10, 0, 5, 0, 0, 0, 0, -10,
+        -20, -10, -10, -5, -5, -10, -10, -20),
+    "king": (
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -20, -30, -30, -40, -40, -30, -30, -20,
+        -10, -20, -20, -20, -20, -20, -20, -10,
+        20, 20, 0, 0, 0, 0, 20, 20,
+        20, 30, 10, 0, 0, 10, 30, 20),
+}
+
+# material and square bonus of each piece code on each square, negative for
+# black pieces, which use the tables flipped top to bottom
+PIECE_SCORES = [None] * 16
+for _name, _code in PIECE_CODES.items():
+    _kind = _name[6:]
+    if _code & BLACK:
+        PIECE_SCORES[_code] = [-PIECE_VALUES[_kind] - PIECE_SQUARE_TABLES[_kind][sq ^ 56] for sq in range(64)]
+    else:
+        PIECE_SCORES[_code] = [PIECE_VALUES[_kind] + PIECE_SQUARE_TABLES[_kind][sq] for sq in range(64)]
+
+# penalty of every pawn beyond the first on a column, of a pawn without
+# friendly pawns on the neighbouring columns, and of a pawn that cannot move
+# because a pawn of either side stands in front of it
+DOUBLED_PAWN = 15
+ISOLATED_PAWN = 10
+BLOCKED_PAWN = 10
+
+FILES = [A_FILE << x for x in range(8)]
+NEIGHBOUR_FILES = [(FILES[x - 1] if x > 0 else 0) | (FILES[x + 1] if x < 7 else 0) for x in range(8)]
+
+# every entry takes a 64-bit key and a 32-bit score
+PAWN_ENTRY_BYTES = 12
+
+
+def board_score(board):
+    # material and square bonus of the 64 piece codes of a board
+    return sum(PIECE_SCORES[piece][sq] for sq, piece in enumerate(board) if piece)
+
+
+def pawn_side_score(pawns, blocked):
+    score = -BLOCKED_PAWN * bin(pawns & blocked).count("1")
+    for x in range(8):
+        count = bin(pawns & FILES[x]).count("1")
+        if count:
+            score -= DOUBLED_PAWN * (count - 1)
+            if not pawns & NEIGHBOUR_FILES[x]:
+                score -= ISOLATED_PAWN * count
+    return score
+
+
+def pawn_structure(white_pawns, black_pawns):
+    # pawn structure score of the pawn bitboards of both sides
+    pawns = white_pawns | black_pawns
+    # white pawns move towards row 8, the lower bit indexes
+    return (pawn_side_score(white_pawns, pawns << 8) -
+            pawn_side_score(black_pawns, pawns >> 8))
+
+
+class PawnTable(object):
+    """Fixed-size cache of pawn structure scores keyed by the hash of the pawns"""
+    def __init__(self, megabytes=1):
+        # number of entries, rounded down to a power of two for masking
+        entries = max(1, megabytes * 1024 * 1024 // PAWN_ENTRY_BYTES)
+        self.size = 1 << (entries.bit_length() - 1)
+        self.mask = self.size - 1
+        self.clear()
+
+    def clear(self):
+        # an empty slot reads as key 0 with score 0, which is also the
+        # correct entry for a board without pawns
+        self.keys = array("Q", bytes(8 * self.size))
+        self.scores = array("i", bytes(4 * self.size))
+        self.probes = 0
+        self.hits = 0
+
+    def score(self, key, pieces):
+        # pawn structure score of a position with the pawn hash key and the
+        # piece bitboards pieces, see BitBoard.pieces
+        index = key & self.mask
+        self.probes += 1
+        if self.keys[index] == key:
+            self.hits += 1
+            return self.scores[index]
+        score = pawn_structure(pieces[WHITE | PAWN], pieces[BLACK | PAWN])
+        # always replace, the newest pawn structures are the ones searched
+        self.keys[index] = key
+        self.scores[index] = score
+        return score
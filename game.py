@@ -3,10 +3,29 @@ import pygame
 from pygame.locals import *
 from piece import Piece
 from chess import Chess
-from utils import Utils
+from engine import Engine
+from worker import SearchWorker
+from render_cache import RenderCache
+from record import GameRecordWriter
+from book import OpeningBook
+from tablebase import Tablebases
+from client import NetworkClient
+from server import parse_move, format_move
+from notation import load_fen
+from profiler import Profiler
+
+# longest wait for an event, in milliseconds, while idle and while the computer thinks
+IDLE_TIMEOUT = 500
+BUSY_TIMEOUT = 10
+# posted by the network reader thread when a server message arrives
+NETWORK_EVENT = USEREVENT
+# screen area of the profiler HUD, below the board
+HUD_RECT = pygame.Rect(0, 692, 640, 58)
 
 class Game:
-    def __init__(self):
+    def __init__(self, sprite_set="pawns", record_path=None, book_path=None,
+                 tablebase_path=None, server=None, network_game=None,
+                 profile=False, profile_path=None):
         # screen dimensions
         screen_width = 640
         screen_height = 750
@@ -16,6 +35,8 @@ class Game:
         self.running = True
         # base folder for program resources
         self.resources = "res"
+        # name of the set of piece images to use, see piece.SPRITE_SETS
+        self.sprite_set = sprite_set
  
         # initialize game window
         pygame.display.init()
@@ -38,8 +59,45 @@ class Game:
         pygame.display.set_icon(icon)
         # update display
         pygame.display.flip()
-        # set game clock
-        self.clock = pygame.time.Clock()
+        # only wake up the game loop for these events, all others are blocked
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed([QUIT, KEYDOWN, MOUSEBUTTONDOWN, VIDEOEXPOSE, NETWORK_EVENT])
+        # screen currently shown, "menu", "game" or "winner"
+        self.shown_screen = None
+        # set when the current screen has to be drawn again
+        self.redraw = True
+        # buttons on the menu and winner screens
+        self.start_btn = pygame.Rect(270, 300, 100, 50)
+        self.computer_btn = pygame.Rect(230, 370, 180, 50)
+        self.reset_btn = pygame.Rect(250, 300, 140, 50)
+        # fonts and text rendered once and reused between frames
+        self.render_cache = RenderCache()
+        # only redraw the squares that changed instead of the whole window
+        self.dirty_rendering = True
+        # opening book for the computer and for hints, see book.py
+        self.book = OpeningBook(book_path) if book_path is not None else None
+        # solved endgames for the computer, see tablebase.py
+        tablebases = Tablebases(tablebase_path) if tablebase_path is not None else None
+        # computer opponent, searching on a background thread
+        self.worker = SearchWorker(Engine(time_limit=1.0, book=self.book, tablebases=tablebases))
+        # (host, port) of a game server to play on instead of this window only
+        self.server = server
+        # game to join on the server, a new one is created when None
+        self.network_game = network_game
+        # server connection, see client.py
+        self.client = None
+        # color played on the server and number of plies the server has sent
+        self.network_color = None
+        self.network_ply = 0
+        # frame timings and call counters, None when not profiling
+        self.profiler = Profiler() if profile else None
+        # file the profile is exported to on exit, JSON or .csv
+        self.profile_path = profile_path
+        # hash of the position the computer is searching
+        self.search_hash = None
+        # file the played games are appended to, see record.py
+        self.record_path = record_path
+        self.recorder = None
 
 
     def start_game(self):
@@ -70,44 +128,139 @@ class Game:
         # get location of image containing the chess pieces
         pieces_src = os.path.join(self.resources, "pieces.png")
         # create class object that handles the gameplay logic
-        self.chess = Chess(self.screen, pieces_src, self.board_locations, square_length)
+        self.chess = Chess(self.screen, pieces_src, self.board_locations, square_length,
+                           render_cache=self.render_cache, board_img=self.board_img,
+                           sprite_set=self.sprite_set)
+        # record every game played in this window
+        if self.record_path is not None:
+            self.recorder = GameRecordWriter(self.record_path)
+            self.chess.board.set_recorder(self.recorder)
+        # play a game hosted by a server, see server.py
+        if self.server is not None:
+            self.connect()
+        # time move generation, piece blits and text rendering
+        if self.profiler is not None:
+            self.profiler.instrument(self.chess.board, "possible_moves")
+            self.profiler.instrument(self.chess.chess_pieces, "draw", "piece_blit")
+            self.profiler.instrument(self.render_cache, "render", "font_render")
+            self.profiler.instrument(self.chess, "draw_dirty")
+            self.profiler.instrument(self.chess, "draw_pieces")
 
         # game loop
         while self.running:
-            self.clock.tick(5)
-            # poll events
-            for event in pygame.event.get():
-                # get keys pressed
-                key_pressed = pygame.key.get_pressed()
-                # check if the game has been closed by the user
-                if event.type == pygame.QUIT or key_pressed[K_ESCAPE]:
-                    # set flag to break out of the game loop
-                    self.running = False
-                elif key_pressed[K_SPACE]:
-                    self.chess.reset()
-            
-            winner = self.chess.winner
-
-            if self.menu_showed == False:
-                self.menu()
-            elif len(winner) > 0:
-                self.declare_winner(winner)
+            # sleep until something happens, waking up often while the computer thinks
+            if self.worker.busy:
+                timeout = BUSY_TIMEOUT
             else:
-                self.game()
-            
-            
-
-            # for testing mechanics of the game
-            #self.game()
-            #self.declare_winner(winner)
-
-            # update display
-            pygame.display.flip()
-            # update events
-            pygame.event.pump()
-
+                timeout = IDLE_TIMEOUT
+            events = [pygame.event.wait(timeout)] + pygame.event.get()
+            profiler = self.profiler
+            if profiler is not None:
+                profiler.begin_frame()
+
+            for event in events:
+                self.handle_event(event)
+            if profiler is not None:
+                profiler.lap("events")
+
+            # play the computer's move when its search is done
+            if self.menu_showed and len(self.chess.winner) == 0:
+                self.computer_turn()
+            if profiler is not None:
+                profiler.lap("logic")
+
+            self.render()
+            if profiler is not None:
+                if profiler.hud:
+                    pygame.display.update(profiler.draw_hud(self.screen, self.render_cache, HUD_RECT))
+                profiler.lap("render")
+                profiler.end_frame()
+
+        # stop the search thread
+        self.worker.close()
+        if self.client is not None:
+            self.client.close()
+        if self.profiler is not None and self.profile_path is not None:
+            self.profiler.export(self.profile_path)
+        # write the game in progress and flush the record file
+        if self.recorder is not None:
+            self.recorder.close()
         # call method to stop pygame
         pygame.quit()
+
+
+    def handle_event(self, event):
+        """dispatch an event to the menu, game or winner screen"""
+        # nothing happened before the wait timed out
+        if event.type == NOEVENT:
+            return
+        # the screen may change, unless a handler below ignores the event
+        changed = True
+        # check if the game has been closed by the user
+        if event.type == pygame.QUIT or (event.type == KEYDOWN and event.key == K_ESCAPE):
+            # set flag to break out of the game loop
+            self.running = False
+        # messages from the game server
+        elif event.type == NETWORK_EVENT:
+            self.network_messages()
+        # the server owns network games, they cannot be reset here
+        elif event.type == KEYDOWN and event.key == K_SPACE and self.client is None:
+            self.worker.cancel()
+            self.chess.reset()
+        # turn the board around
+        elif event.type == KEYDOWN and event.key == K_f:
+            self.chess.set_flipped(not self.chess.input.flipped)
+        # show or hide the profiler HUD
+        elif event.type == KEYDOWN and event.key == K_F3 and self.profiler is not None:
+            self.profiler.hud = not self.profiler.hud
+            self.screen.fill((0, 0, 0), HUD_RECT)
+            pygame.display.update(HUD_RECT)
+        # show a book move for the player to move
+        elif event.type == KEYDOWN and event.key == K_h:
+            # hint() asks for a redraw when it has a move to show
+            self.hint()
+            changed = False
+        # the window was uncovered, draw all of it again
+        elif event.type == VIDEOEXPOSE:
+            self.chess.invalidate()
+        elif self.menu_showed == False:
+            changed = self.menu_event(event)
+        elif len(self.chess.winner) > 0:
+            changed = self.winner_event(event)
+        else:
+            changed = self.game_event(event)
+        if changed:
+            self.redraw = True
+
+
+    def render(self):
+        """draw the current screen if anything changed"""
+        winner = self.chess.winner
+        if self.menu_showed == False:
+            screen = "menu"
+        elif len(winner) > 0:
+            screen = "winner"
+        else:
+            screen = "game"
+        # switching screens always redraws everything
+        if screen != self.shown_screen:
+            self.shown_screen = screen
+            self.redraw = True
+            self.chess.invalidate()
+
+        if screen == "menu":
+            if self.redraw:
+                self.menu()
+                # update display
+                pygame.display.flip()
+        elif screen == "winner":
+            if self.redraw:
+                self.declare_winner(winner)
+                # update display
+                pygame.display.flip()
+        else:
+            self.game()
+        self.redraw = False
     
 
     def menu(self):
@@ -119,19 +272,21 @@ class Game:
         # black color
         black_color = (0, 0, 0)
         # coordinates for "Play" button
-        start_btn = pygame.Rect(270, 300, 100, 50)
+        start_btn = self.start_btn
         # show play button
         pygame.draw.rect(self.screen, black_color, start_btn)
+        # coordinates for "vs Computer" button
+        computer_btn = self.computer_btn
+        # show computer button
+        pygame.draw.rect(self.screen, black_color, computer_btn)
 
         # white color
         white_color = (255, 255, 255)
-        # create fonts for texts
-        big_font = pygame.font.SysFont("comicsansms", 50)
-        small_font = pygame.font.SysFont("comicsansms", 20)
         # create text to be shown on the game menu
-        welcome_text = big_font.render("Chess", False, black_color)
-        created_by = small_font.render("Created by Shokun", True, black_color)
-        start_btn_label = small_font.render("Play", True, white_color)
+        welcome_text = self.render_cache.text("Chess", 50, black_color, False)
+        created_by = self.render_cache.text("Created by Shokun", 20, black_color)
+        start_btn_label = self.render_cache.text("Play", 20, white_color)
+        computer_btn_label = self.render_cache.text("vs Computer", 20, white_color)
         
         # show welcome text
         self.screen.blit(welcome_text, 
@@ -145,30 +300,114 @@ class Game:
         self.screen.blit(start_btn_label, 
                       ((start_btn.x + (start_btn.width - start_btn_label.get_width()) // 2, 
                       start_btn.y + (start_btn.height - start_btn_label.get_height()) // 2)))
+        # show text on the computer button
+        self.screen.blit(computer_btn_label, 
+                      ((computer_btn.x + (computer_btn.width - computer_btn_label.get_width()) // 2, 
+                      computer_btn.y + (computer_btn.height - computer_btn_label.get_height()) // 2)))
 
-        # get pressed keys
-        key_pressed = pygame.key.get_pressed()
-        # 
-        util = Utils()
 
+    def menu_event(self, event):
+        """handle clicks on the menu buttons, returns True if one was used"""
         # check if left mouse button was clicked
-        if util.left_click_event():
-            # call function to get mouse event
-            mouse_coords = util.get_mouse_event()
-
+        if event.type == MOUSEBUTTONDOWN and event.button == 1:
             # check if "Play" button was clicked
-            if start_btn.collidepoint(mouse_coords[0], mouse_coords[1]):
-                # change button behavior as it is hovered
-                pygame.draw.rect(self.screen, white_color, start_btn, 3)
-                
-                # change menu flag
-                self.menu_showed = True
-            # check if enter or return key was pressed
-            elif key_pressed[K_RETURN]:
-                self.menu_showed = True
+            if self.start_btn.collidepoint(event.pos):
+                # two players take turns
+                self.chess.computer = None
+            # check if "vs Computer" button was clicked
+            elif self.computer_btn.collidepoint(event.pos):
+                # the computer plays black
+                self.chess.computer = "black"
+            else:
+                return False
+        # check if enter or return key was pressed
+        elif not (event.type == KEYDOWN and event.key == K_RETURN):
+            return False
+        # change menu flag
+        self.menu_showed = True
+        # the other side of a network game is played on the server
+        if self.client is not None:
+            self.chess.computer = None
+        return True
+
+
+    def game_event(self, event):
+        """let the player move pieces with the mouse, returns True for a click"""
+        clicked = False
+        for selected in self.chess.input.clicks([event]):
+            clicked = True
+            if self.client is None:
+                self.chess.handle_turn(selected)
+            # only move the network player's pieces, and tell the server
+            elif self.chess.turn.get(self.network_color, 0):
+                history = self.chess.board.history
+                plies = len(history)
+                self.chess.handle_turn(selected)
+                if len(history) > plies:
+                    self.network_ply += 1
+                    self.client.send("MOVE", self.network_game, format_move(history[-1][0]))
+        return clicked
+
+
+    def connect(self):
+        """connect to the game server and create or join a game"""
+        host, port = self.server
+        self.client = NetworkClient(host, port,
+                                    lambda: pygame.event.post(pygame.event.Event(NETWORK_EVENT)))
+        if self.network_game is None:
+            self.client.send("CREATE")
+        else:
+            self.client.send("JOIN", self.network_game, "any")
+
+
+    def network_messages(self):
+        """apply the messages of the game server"""
+        if self.client is None:
+            return
+        for words in self.client.poll():
+            # the connection was closed
+            if words is None:
+                print("disconnected from the server")
+                self.client = None
+                return
+            message = words[0]
+            if message == "GAME":
+                self.network_game = words[1]
+                print("created game {}, join it with --game {}".format(words[1], words[1]))
+                self.client.send("JOIN", self.network_game, "any")
+            elif message == "JOINED":
+                self.network_color = words[2]
+                print("playing {} in game {}".format(self.network_color, words[1]))
+            elif message == "STATE":
+                self.network_ply = int(words[2])
+                load_fen(self.chess.board, " ".join(words[3:]))
+                self.chess.moves = []
+                self.chess.invalidate()
+            elif message == "MOVED":
+                # our own moves come back after they were played here
+                ply = int(words[2])
+                if ply > self.network_ply:
+                    self.network_ply = ply
+                    self.chess.play_move(parse_move(words[3]))
+            elif message == "ERROR":
+                print("server: {}".format(" ".join(words[1:])))
+        self.redraw = True
 
 
     def game(self):
+        if self.dirty_rendering:
+            # redraw only what changed
+            rects = self.chess.draw_dirty()
+            # nothing is sent to the display when nothing changed
+            if rects:
+                pygame.display.update(rects)
+        elif self.redraw:
+            self.draw_game()
+            # update display
+            pygame.display.flip()
+
+
+    def draw_game(self):
         # background color
         color = (0,0,0)
         # set backgound color
@@ -177,12 +416,51 @@ class Game:
         # show the chess board
         self.screen.blit(self.board_img, self.board_dimensions)
 
-        # call self.chess. something
-        self.chess.play_turn()
+        # show whose turn it is
+        self.chess.draw_turn()
         # draw pieces on the chess board
         self.chess.draw_pieces()
 
 
+    def computer_turn(self):
+        """start, cancel or finish the background search of the computer's move"""
+        board = self.chess.board
+        computer = self.chess.computer
+        # the server plays the other side of network games
+        if self.client is not None:
+            return
+
+        # play the computer's move once the search is done
+        result = self.worker.poll()
+        if result is not None and result[2]:
+            move, info, finished = result
+            if move is not None and board.hash == self.search_hash:
+                self.chess.play_move(move)
+                self.redraw = True
+            print("engine: depth {depth} score {score} nodes {nodes} "
+                  "time {time:.3f}s nps {nps:.0f}".format(**info))
+
+        # the position changed under the search, e.g. the player moved
+        if self.worker.busy and board.hash != self.search_hash:
+            self.worker.cancel()
+
+        # start thinking when it is the computer's turn
+        if (computer is not None and len(self.chess.winner) == 0 and
+                self.chess.turn[computer] and not self.worker.busy):
+            self.search_hash = board.hash
+            self.worker.start_search(board)
+
+
+    def hint(self):
+        """highlight the book move of the side to move, if the position is in the book"""
+        if self.book is None or self.shown_screen != "game" or len(self.chess.winner) > 0:
+            return
+        move = self.book.choose(self.chess.board)
+        if move is not None:
+            self.chess.show_hint(move)
+            self.redraw = True
+
+
     def declare_winner(self, winner):
         # background color
         bg_color = (255, 255, 255)
@@ -191,23 +469,19 @@ class Game:
         # black color
         black_color = (0, 0, 0)
         # coordinates for play again button
-        reset_btn = pygame.Rect(250, 300, 140, 50)
+        reset_btn = self.reset_btn
         # show reset button
         pygame.draw.rect(self.screen, black_color, reset_btn)
 
         # white color
         white_color = (255, 255, 255)
-        # create fonts for texts
-        big_font = pygame.font.SysFont("comicsansms", 50)
-        small_font = pygame.font.SysFont("comicsansms", 20)
-
         # text to show winner
-        text = winner + " wins!" 
-        winner_text = big_font.render(text, False, black_color)
+        text = "Draw!" if winner == "Draw" else winner + " wins!"
+        winner_text = self.render_cache.text(text, 50, black_color, False)
 
         # create text to be shown on the reset button
         reset_label = "Play Again"
-        reset_btn_label = small_font.render(reset_label, True, white_color)
+        reset_btn_label = self.render_cache.text(reset_label, 20, white_color)
 
         # show winner text
         self.screen.blit(winner_text, 
@@ -219,27 +493,23 @@ class Game:
                       ((reset_btn.x + (reset_btn.width - reset_btn_label.get_width()) // 2, 
                       reset_btn.y + (reset_btn.height - reset_btn_label.get_height()) // 2)))
 
-        # get pressed keys
-        key_pressed = pygame.key.get_pressed()
-        # 
-        util = Utils()
 
-        # check if left mouse button was clicked
-        if util.left_click_event():
-            # call function to get mouse event
-            mouse_coords = util.get_mouse_event()
-
-            # check if reset button was clicked
-            if reset_btn.collidepoint(mouse_coords[0], mouse_coords[1]):
-                # change button behavior as it is hovered
-                pygame.draw.rect(self.screen, white_color, reset_btn, 3)
-                
-                # change menu flag
-                self.menu_showed = False
-            # check if enter or return key was pressed
-            elif key_pressed[K_RETURN]:
-                self.menu_showed = False
-            # reset game
-            self.chess.reset()
-            # clear winner
-            self.chess.winner = ""
\ No newline at end of file
+    def winner_event(self, event):
+        """start a new game, going back to the menu from the reset button;
+        returns True if the game was reset"""
+        # check if the reset button was clicked or enter or return was pressed
+        clicked = (event.type == MOUSEBUTTONDOWN and event.button == 1 and
+                   self.reset_btn.collidepoint(event.pos))
+        if not clicked and not (event.type == KEYDOWN and event.key == K_RETURN):
+            return False
+        # change menu flag
+        self.menu_showed = False
+        # reset game
+        self.worker.cancel()
+        self.chess.reset()
+        # start a new game on the server
+        if self.client is not None:
+            self.client.send("LEAVE", self.network_game)
+            self.network_game = None
+            self.client.send("CREATE")
+        return True
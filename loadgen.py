@@ -0,0 +1,129 @@
+import argparse
+import asyncio
+import random
+import time
+
+from board import Board
+from notation import load_fen
+from server import PORT, GameServer, parse_move, format_move
+
+
+class LoadPlayer(object):
+    """Plays random moves of one color of a server game over a connection"""
+    def __init__(self, reader, writer, rng, max_plies, latencies):
+        self.reader = reader
+        self.writer = writer
+        self.rng = rng
+        self.max_plies = max_plies
+        # seconds from sending a move to the server echoing it, shared by all players
+        self.latencies = latencies
+        self.board = Board()
+        self.game_id = None
+        self.color = None
+        self.sent = None
+
+    def send(self, *words):
+        self.writer.write((" ".join(words) + "\n").encode())
+
+    async def read(self):
+        line = await self.reader.readline()
+        if not line:
+            raise ConnectionError("server closed the connection")
+        return line.decode().split()
+
+    def play(self):
+        # move when it is our turn
+        board = self.board
+        if (board.side_to_move() == self.color and len(board.winner) == 0 and
+                len(board.history) < self.max_plies):
+            moves = board.legal_moves()
+            if moves:
+                self.sent = time.perf_counter()
+                self.send("MOVE", self.game_id, format_move(self.rng.choice(moves)))
+
+    async def run(self):
+        # play until the game is won or max_plies have been played
+        while len(self.board.winner) == 0 and len(self.board.history) < self.max_plies:
+            words = await self.read()
+            if words[0] == "JOINED":
+                self.color = words[2]
+            elif words[0] == "STATE":
+                load_fen(self.board, " ".join(words[3:]))
+                self.play()
+            elif words[0] == "MOVED":
+                if self.sent is not None and self.board.side_to_move() == self.color:
+                    self.latencies.append(time.perf_counter() - self.sent)
+                    self.sent = None
+                self.board.make_move(parse_move(words[3]))
+                self.board.update_winner()
+                self.play()
+            elif words[0] == "ERROR":
+                raise RuntimeError(" ".join(words[1:]))
+            await self.writer.drain()
+        self.send("LEAVE", self.game_id)
+        await self.writer.drain()
+        self.writer.close()
+
+
+async def play_game(host, port, seed, max_plies, latencies):
+    # two connections playing each other through the server
+    rng = random.Random(seed)
+    players = []
+    for _ in range(2):
+        reader, writer = await asyncio.open_connection(host, port)
+        players.append(LoadPlayer(reader, writer, rng, max_plies, latencies))
+    white, black = players
+    white.send("CREATE")
+    await white.writer.drain()
+    words = await white.read()
+    game_id = words[1]
+    for player, color in ((white, "white"), (black, "black")):
+        player.game_id = game_id
+        player.send("JOIN", game_id, color)
+        await player.writer.drain()
+    await asyncio.gather(white.run(), black.run())
+    return len(white.board.history)
+
+
+async def run_load(host, port, games, max_plies, seed):
+    latencies = []
+    start = time.perf_counter()
+    plies = await asyncio.gather(*[play_game(host, port, seed * 1000003 + number, max_plies, latencies)
+                                   for number in range(games)])
+    return sum(plies), time.perf_counter() - start, sorted(latencies)
+
+
+async def run_local(games, max_plies, seed, port):
+    # host the server in this process on a loopback port
+    server = GameServer()
+    listener = await asyncio.start_server(server.handle, "127.0.0.1", port)
+    async with listener:
+        return await run_load("127.0.0.1", port, games, max_plies, seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play many random games against a game server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--games", type=int, default=100, help="games played at the same time")
+    parser.add_argument("--plies", type=int, default=40, help="plies played per game at most")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--local", action="store_true",
+                        help="start a server in this process instead of connecting to one")
+    args = parser.parse_args()
+
+    if args.local:
+        moves, elapsed, latencies = asyncio.run(run_local(args.games, args.plies, args.seed, args.port))
+    else:
+        moves, elapsed, latencies = asyncio.run(run_load(args.host, args.port, args.games,
+                                                         args.plies, args.seed))
+    print("{} games, {} moves in {:.3f}s, {:.0f} moves per second".format(
+        args.games, moves, elapsed, moves / elapsed if elapsed > 0 else 0.0))
+    if latencies:
+        print("move latency ms: median {:.2f} p99 {:.2f} max {:.2f}".format(
+            1000 * latencies[len(latencies) // 2], 1000 * latencies[len(latencies) * 99 // 100],
+            1000 * latencies[-1]))
+
+
+if __name__ == "__main__":
+    main()
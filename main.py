@@ -1,5 +1,34 @@
+import argparse
+
 from game import Game
+from piece import SPRITE_SETS
 
 if __name__=="__main__":
-    game = Game()
+    parser = argparse.ArgumentParser(description="Chess but pawn")
+    parser.add_argument("--sprites", choices=sorted(SPRITE_SETS), default="pawns",
+                        help="set of piece images to draw")
+    parser.add_argument("--record", metavar="PATH",
+                        help="append the played games to this game record file")
+    parser.add_argument("--book", metavar="PATH",
+                        help="opening book for the computer and the H hint key, see book.py")
+    parser.add_argument("--tablebases", metavar="DIR",
+                        help="directory of endgame tables for the computer, see tablebase.py")
+    parser.add_argument("--connect", metavar="HOST:PORT",
+                        help="play a game hosted by a game server, see server.py")
+    parser.add_argument("--game", help="game to join on the server, a new one is created by default")
+    parser.add_argument("--profile", action="store_true",
+                        help="time frames and hot calls, shown on a HUD toggled with F3")
+    parser.add_argument("--profile-out", metavar="PATH",
+                        help="export the profile on exit, as CSV for a .csv path and JSON otherwise")
+    args = parser.parse_args()
+    server = None
+    if args.connect:
+        host, _, port = args.connect.rpartition(":")
+        server = (host, int(port))
+
+    game = Game(sprite_set=args.sprites, record_path=args.record,
+                book_path=args.book, tablebase_path=args.tablebases,
+                server=server, network_game=args.game,
+                profile=args.profile or args.profile_out is not None,
+                profile_path=args.profile_out)
     game.start_game()
@@ -0,0 +1,392 @@
+import argparse
+import collections
+import multiprocessing
+import os
+import re
+import time
+
+from board import Board
+from bitboard import square, coords, location, encode_move, squares, PIECE_CODES, COLOR_BITS, PAWN, KING, KIND
+from record import GameRecordReader, replay
+
+# FEN letter of each piece, upper case for white
+FEN_LETTERS = {"pawn": "p", "knight": "n", "bishop": "b", "rook": "r", "queen": "q", "king": "k"}
+FEN_PIECES = {}
+for kind, letter in FEN_LETTERS.items():
+    FEN_PIECES[letter] = "black_" + kind
+    FEN_PIECES[letter.upper()] = "white_" + kind
+# FEN letter of every piece code, see bitboard.py
+FEN_CODES = [""] * 16
+for letter, piece_name in FEN_PIECES.items():
+    FEN_CODES[PIECE_CODES[piece_name]] = letter
+
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w - - 0 1"
+
+# PGN result of each Board.winner value
+PGN_RESULTS = {"": "*", "White": "1-0", "Black": "0-1", "Draw": "1/2-1/2"}
+PGN_WINNERS = {result: winner for winner, result in PGN_RESULTS.items()}
+
+# a move in standard algebraic notation, after check and annotation marks are stripped
+SAN_MOVE = re.compile(r"^([KQRBN])?([a-h])?([1-8])?x?([a-h][1-8])$")
+# comments, move numbers and annotation glyphs in PGN movetext
+PGN_NOISE = re.compile(r"\{[^}]*\}|;[^\n]*|\$\d+|\d+\.(\.\.)?")
+PGN_TAG = re.compile(r'^\[(\w+)\s+"(.*)"\]\s*$')
+
+# size of the pieces of a file parsed by one process at a time
+CHUNK_BYTES = 1 << 22
+
+
+def to_fen(board):
+    # FEN of the board, castling and en passant are not part of this game
+    pieces = board.bitboard.board
+    rows = []
+    for y in range(8):
+        row = ""
+        empty = 0
+        for x in range(8):
+            piece = pieces[y * 8 + x]
+            if not piece:
+                empty += 1
+                continue
+            if empty:
+                row += str(empty)
+                empty = 0
+            row += FEN_CODES[piece]
+        if empty:
+            row += str(empty)
+        rows.append(row)
+    side = "b" if board.turn["black"] else "w"
+    # the halfmove clock is not kept, there is no fifty-move rule in this game
+    return "{} {} - - 0 {}".format("/".join(rows), side, board.move_number())
+
+
+def parse_fen(fen):
+    # convert a FEN into ({"e1": "white_king", ...}, turn)
+    fields = fen.split()
+    if len(fields) < 2:
+        raise ValueError("invalid FEN: {}".format(fen))
+    rows = fields[0].split("/")
+    if len(rows) != 8:
+        raise ValueError("invalid FEN: {}".format(fen))
+    pieces = {}
+    for y, row in enumerate(rows):
+        x = 0
+        for letter in row:
+            if letter.isdigit():
+                x += int(letter)
+            elif letter in FEN_PIECES:
+                if x < 8:
+                    pieces[location(y * 8 + x)] = FEN_PIECES[letter]
+                x += 1
+            else:
+                raise ValueError("invalid FEN: {}".format(fen))
+        if x != 8:
+            raise ValueError("invalid FEN: {}".format(fen))
+    if fields[1] not in ("w", "b"):
+        raise ValueError("invalid FEN: {}".format(fen))
+    return pieces, "white" if fields[1] == "w" else "black"
+
+
+def load_fen(board, fen):
+    # set up the board from a FEN, keeping its move number
+    pieces, turn = parse_fen(fen)
+    board.set_position(pieces, turn)
+    fields = fen.split()
+    if len(fields) >= 6:
+        if not fields[5].isdigit() or int(fields[5]) < 1:
+            raise ValueError("invalid FEN: {}".format(fen))
+        board.start_move_number = int(fields[5])
+    return board
+
+
+def sources(board, piece, dst):
+    # squares of the pieces with the given code that can move to dst
+    bb = board.bitboard
+    return [src for src in squares(bb.pieces[piece]) if bb.legal_targets(piece, src) >> dst & 1]
+
+
+def to_san(board, move):
+    # standard algebraic notation of a move of the side to move
+    src = move & 63
+    dst = move >> 6
+    piece = board.bitboard.board[src]
+    captured = board.bitboard.board[dst]
+    x, y = coords(src)
+
+    # other pieces of the same type that can reach the destination
+    others = [coords(other) for other in sources(board, piece, dst) if other != src]
+    text = ""
+    if piece & KIND == PAWN:
+        # pawn moves always name the column when the pawn captures
+        if others or captured:
+            text = location(src)[0]
+            if any(other[0] == x for other in others):
+                text += location(src)[1]
+    else:
+        text = FEN_CODES[piece].upper()
+        if others:
+            if all(other[0] != x for other in others):
+                text += location(src)[0]
+            elif all(other[1] != y for other in others):
+                text += location(src)[1]
+            else:
+                text += location(src)
+    if captured:
+        text += "x"
+    text += location(dst)
+    # mark checks and checkmates
+    board.make_move(move)
+    if board.in_check():
+        text += "+" if board.bitboard.has_legal_move(board.side_to_move()) else "#"
+    elif captured & KIND == KING:
+        text += "#"
+    board.unmake_move()
+    return text
+
+
+def parse_san(board, san):
+    # encoded move of the side to move for a move in algebraic notation
+    match = SAN_MOVE.match(san.rstrip("+#!?"))
+    if match is None:
+        raise ValueError("invalid move: {}".format(san))
+    letter, column, row, destination = match.groups()
+    piece = COLOR_BITS[board.side_to_move()] | (PIECE_CODES[FEN_PIECES[letter]] & KIND if letter else PAWN)
+    dst = square(ord(destination[0]) - 97, 8 - int(destination[1]))
+    candidates = []
+    for src in sources(board, piece, dst):
+        source = location(src)
+        if (column and source[0] != column) or (row and source[1] != row):
+            continue
+        candidates.append(src)
+    if len(candidates) != 1:
+        raise ValueError("{} move: {}".format("ambiguous" if candidates else "illegal", san))
+    return encode_move(candidates[0], dst)
+
+
+def to_pgn(board, tags=None):
+    # PGN of the moves played on the board since it was set up
+    start = board.copy()
+    while start.history:
+        start.unmake_move()
+    start.captured = []
+    start.winner = ""
+
+    headers = dict(tags or {})
+    headers.setdefault("Result", PGN_RESULTS[board.winner])
+    fen = to_fen(start)
+    if fen != START_FEN:
+        headers["SetUp"] = "1"
+        headers["FEN"] = fen
+
+    number = start.move_number()
+    tokens = []
+    if start.turn["black"]:
+        tokens.append("{}...".format(number))
+    for move, _, _, _ in board.history:
+        if start.turn["white"]:
+            tokens.append("{}.".format(number))
+        else:
+            number += 1
+        tokens.append(to_san(start, move))
+        start.make_move(move)
+    tokens.append(headers["Result"])
+
+    lines = ['[{} "{}"]'.format(name, value) for name, value in headers.items()]
+    # wrap the movetext at 80 columns
+    line = ""
+    movetext = []
+    for token in tokens:
+        if len(line) + len(token) + 1 > 80:
+            movetext.append(line)
+            line = token
+        else:
+            line = token if len(line) == 0 else line + " " + token
+    movetext.append(line)
+    return "\n".join(lines) + "\n\n" + "\n".join(movetext) + "\n"
+
+
+def record_to_pgn(first_player, winner, moves, tags=None):
+    # PGN of a game from a record file, see record.py
+    board = replay(Board(), first_player, moves)
+    board.winner = winner
+    return to_pgn(board, tags)
+
+
+def parse_pgn_game(text, board=None):
+    # returns (tags, moves) for the text of one game, moves are encoded moves
+    # from the position of the FEN tag or the starting position
+    if board is None:
+        board = Board()
+    tags = {}
+    movetext = []
+    for line in text.splitlines():
+        match = PGN_TAG.match(line)
+        if match is not None:
+            tags[match.group(1)] = match.group(2)
+        elif not line.startswith("%"):
+            movetext.append(line)
+    load_fen(board, tags.get("FEN", START_FEN))
+
+    body = PGN_NOISE.sub(" ", "\n".join(movetext))
+    # drop variations, which may be nested
+    depth = 0
+    tokens = []
+    for token in body.replace("(", " ( ").replace(")", " ) ").split():
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth -= 1
+        elif depth == 0:
+            tokens.append(token)
+
+    moves = []
+    for token in tokens:
+        if token in PGN_WINNERS:
+            tags.setdefault("Result", token)
+            break
+        move = parse_san(board, token)
+        board.make_move(move)
+        moves.append(move)
+    return tags, moves
+
+
+def is_game_start(line, previous):
+    # a game starts with the first tag after a blank line or movetext
+    return line.startswith("[") and not previous.startswith("[")
+
+
+def split_pgn(lines):
+    # group the lines of a PGN file into the text of each game
+    game = []
+    previous = ""
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if is_game_start(line, previous) and any(game_line.strip() for game_line in game):
+            yield "\n".join(game)
+            game = []
+        game.append(line)
+        previous = line
+    if any(line.strip() for line in game):
+        yield "\n".join(game)
+
+
+def iter_pgn(file):
+    # yield (tags, moves) for every game of a PGN file object, one at a time
+    board = Board()
+    for text in split_pgn(file):
+        yield parse_pgn_game(text, board)
+
+
+def iter_fen(file):
+    # yield (pieces, turn) for every FEN line of a file object, lines may carry
+    # EPD operations after the first four fields
+    for line in file:
+        line = line.strip()
+        if len(line) > 0 and not line.startswith("#"):
+            yield parse_fen(line)
+
+
+def is_line_start(line, previous):
+    return True
+
+
+def chunk_offsets(path, starts_record, chunk_bytes=CHUNK_BYTES):
+    # split a file into (start, end) byte ranges that begin where a record
+    # (a game or a line) begins, so every record falls in exactly one range
+    size = os.path.getsize(path)
+    offsets = [0]
+    with open(path, "rb") as file:
+        for start in range(chunk_bytes, size, chunk_bytes):
+            if start <= offsets[-1]:
+                continue
+            # skip the line cut by the range, then look for the next record
+            file.seek(start - 1)
+            file.readline()
+            previous = None
+            while True:
+                offset = file.tell()
+                line = file.readline()
+                if not line:
+                    break
+                text = line.decode("utf-8", "replace")
+                if previous is not None and starts_record(text, previous):
+                    break
+                previous = text
+            if not line:
+                break
+            offsets.append(offset)
+    offsets.append(size)
+    return list(zip(offsets, offsets[1:]))
+
+
+def read_chunk(path, start, end):
+    # decoded lines of a byte range of a file
+    with open(path, "rb") as file:
+        file.seek(start)
+        return file.read(end - start).decode("utf-8", "replace").splitlines()
+
+
+def parse_pgn_chunk(args):
+    board = Board()
+    return [parse_pgn_game(text, board) for text in split_pgn(read_chunk(*args))]
+
+
+def parse_fen_chunk(args):
+    return list(iter_fen(read_chunk(*args)))
+
+
+def parallel_parse(path, kind="pgn", processes=None, chunk_bytes=CHUNK_BYTES):
+    # yield the games ("pgn") or positions ("fen") of a file in order, parsed
+    # by a pool of processes that each take a byte range of the file
+    if kind == "pgn":
+        parse, starts_record = parse_pgn_chunk, is_game_start
+    else:
+        parse, starts_record = parse_fen_chunk, is_line_start
+    chunks = [(path, start, end) for start, end in chunk_offsets(path, starts_record, chunk_bytes)]
+    # keep a few chunks per process in flight, so parsed chunks do not pile up
+    # when the consumer is slower than the pool
+    window = 2 * (processes or os.cpu_count() or 1)
+    with multiprocessing.Pool(processes) as pool:
+        pending = collections.deque()
+        for chunk in chunks:
+            pending.append(pool.apply_async(parse, (chunk,)))
+            if len(pending) < window:
+                continue
+            for result in pending.popleft().get():
+                yield result
+        while pending:
+            for result in pending.popleft().get():
+                yield result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Read and convert FEN and PGN files")
+    parser.add_argument("path", help="PGN or FEN file, or a game record file with --record")
+    parser.add_argument("--fen", action="store_true", help="the file holds one FEN per line")
+    parser.add_argument("--record", action="store_true",
+                        help="print a game record file as PGN")
+    parser.add_argument("--processes", type=int, default=0,
+                        help="parse with this many processes, 0 parses in this one")
+    args = parser.parse_args()
+
+    if args.record:
+        with GameRecordReader(args.path) as reader:
+            for number, (first_player, winner, moves) in enumerate(reader, 1):
+                print(record_to_pgn(first_player, winner, moves, {"Round": str(number)}))
+        return
+
+    start = time.perf_counter()
+    if args.processes:
+        items = parallel_parse(args.path, "fen" if args.fen else "pgn", args.processes)
+        count = sum(1 for _ in items)
+    else:
+        with open(args.path, encoding="utf-8", errors="replace") as file:
+            items = iter_fen(file) if args.fen else iter_pgn(file)
+            count = sum(1 for _ in items)
+    elapsed = time.perf_counter() - start
+    print("{} {} in {:.3f}s, {:.0f} per second".format(
+        count, "positions" if args.fen else "games", elapsed, count / elapsed if elapsed > 0 else 0.0))
+
+
+if __name__ == "__main__":
+    main()
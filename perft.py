@@ -0,0 +1,149 @@
+import argparse
+import time
+
+from board import Board, MOVE_BACKENDS
+from bitboard import location
+from notation import load_fen
+
+# leaf node counts from the starting position, for either side to move
+START_POSITION_NODES = {
+    1: 20,
+    2: 400,
+    3: 8982,
+    4: 201369,
+    5: 5039166,
+}
+# (FEN, {depth: leaf nodes}) of positions exercising the legal move rules
+TEST_POSITIONS = {
+    # a rook and a bishop pinned to the white king
+    "pins": ("4r2k/8/8/8/1b2R3/8/3B4/4K3 w - - 0 1",
+             {1: 12, 2: 203, 3: 3693, 4: 68468}),
+    # check by a rook and a knight at once, only the king can move
+    "double check": ("4r2k/8/8/8/8/3n4/8/4K3 w - - 0 1",
+                     {1: 3, 2: 72, 3: 222, 4: 4966}),
+    # check by a pawn's double step, which the knight in front of the pawn
+    # does not block but the white pawn capturing the knight does
+    "double step check": ("7k/4p3/4n3/3PK3/8/8/8/8 w - - 0 1",
+                          {1: 3, 2: 27, 3: 148, 4: 1532}),
+    # the pawn on e6 keeps the black pawn's double step off the king, so it
+    # cannot take the rook
+    "frozen pawn": ("7k/3rp3/3nP3/4K3/8/8/8/8 w - - 0 1",
+                    {1: 3, 2: 45, 3: 272, 4: 4765}),
+    # the same for black, with a knight pinned by a bishop
+    "black frozen pawn": ("3r4/B7/7K/2n5/3k4/3p4/3Pq3/3R4 b - - 0 1",
+                          {1: 30, 2: 321, 3: 9716, 4: 126191}),
+}
+
+
+def perft(board, depth):
+    # count the leaf nodes of the game tree to the given depth
+    if depth == 0:
+        return 1
+    # a king can only be captured in positions set up with the side not to
+    # move in check, the game is over then
+    if len(board.winner) > 0:
+        return 0
+    moves = board.legal_moves()
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        board.make_move(move)
+        nodes += perft(board, depth - 1)
+        board.unmake_move()
+    return nodes
+
+
+def divide(board, depth):
+    # leaf node counts split by root move, as {"e2e4": nodes}
+    counts = {}
+    for move in board.legal_moves():
+        board.make_move(move)
+        counts[location(move & 63) + location(move >> 6)] = perft(board, depth - 1)
+        board.unmake_move()
+    return counts
+
+
+def timed_perft(board, depth):
+    # returns (nodes, seconds, nodes per second)
+    start = time.perf_counter()
+    nodes = perft(board, depth)
+    elapsed = time.perf_counter() - start
+    return nodes, elapsed, nodes / elapsed if elapsed > 0 else 0.0
+
+
+def verify(depth):
+    # check every backend against the known node counts and each other, from
+    # the starting position and the test positions
+    ok = True
+    # node counts of the first backend, keyed by (turn, depth)
+    reference = {}
+    for backend in MOVE_BACKENDS:
+        for turn in ("white", "black"):
+            board = Board(backend)
+            board.reset(turn)
+            for d in range(1, depth + 1):
+                nodes, elapsed, nps = timed_perft(board, d)
+                expected = START_POSITION_NODES.get(d, reference.get((turn, d)))
+                reference.setdefault((turn, d), nodes)
+                status = "ok"
+                if expected is not None and nodes != expected:
+                    status = "FAILED, expected {}".format(expected)
+                    ok = False
+                print("{:8} {:5} depth {} nodes {:10} {:8.3f}s {:10.0f} nps {}".format(
+                    backend, turn, d, nodes, elapsed, nps, status))
+        for name, (fen, counts) in TEST_POSITIONS.items():
+            board = load_fen(Board(backend), fen)
+            for d in range(1, min(depth, max(counts)) + 1):
+                nodes, elapsed, nps = timed_perft(board, d)
+                status = "ok"
+                if nodes != counts[d]:
+                    status = "FAILED, expected {}".format(counts[d])
+                    ok = False
+                print("{:8} {:17} depth {} nodes {:10} {:8.3f}s {:10.0f} nps {}".format(
+                    backend, name, d, nodes, elapsed, nps, status))
+    return ok
+
+
+def parse_pieces(pieces):
+    # convert ["e1:white_king", ...] into {"e1": "white_king", ...}
+    return dict(piece.split(":") for piece in pieces)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Count move generator leaf nodes")
+    parser.add_argument("depth", type=int, help="search depth in plies")
+    parser.add_argument("--backend", choices=MOVE_BACKENDS, default="bitboard")
+    parser.add_argument("--turn", choices=("white", "black"), default="white",
+                        help="side to move")
+    parser.add_argument("--pieces", nargs="+", metavar="SQUARE:PIECE",
+                        help="arbitrary position instead of the starting one, e.g. e1:white_king")
+    parser.add_argument("--divide", action="store_true", help="print node counts per root move")
+    parser.add_argument("--verify", action="store_true",
+                        help="check all backends against the known node counts")
+    args = parser.parse_args()
+
+    if args.verify:
+        raise SystemExit(0 if verify(args.depth) else 1)
+
+    board = Board(args.backend)
+    if args.pieces:
+        board.set_position(parse_pieces(args.pieces), args.turn)
+    else:
+        board.reset(args.turn)
+
+    if args.divide:
+        start = time.perf_counter()
+        counts = divide(board, args.depth)
+        elapsed = time.perf_counter() - start
+        for move in sorted(counts):
+            print("{}: {}".format(move, counts[move]))
+        nodes = sum(counts.values())
+        nps = nodes / elapsed if elapsed > 0 else 0.0
+    else:
+        nodes, elapsed, nps = timed_perft(board, args.depth)
+    print("nodes {} time {:.3f}s nps {:.0f}".format(nodes, elapsed, nps))
+
+
+if __name__ == "__main__":
+    main()
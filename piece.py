@@ -1,8 +1,49 @@
 import os
 import pygame
+from collections import OrderedDict
+
+from bitboard import PIECE_CODES
+
+# Sprite sets map piece names to their index on the spritesheet.
+# "pawns" maps ALL pieces to the 'white_pawn' index (5), which makes every
+# piece on the board appear as a white pawn. If you wanted them all to be
+# black pawns, you would use index 11. "classic" shows every piece as itself.
+SPRITE_SETS = {
+    "pawns": {
+        "white_pawn":   5,
+        "white_knight": 5,
+        "white_bishop": 5,
+        "white_rook":   5,
+        "white_king":   5,
+        "white_queen":  5,
+        "black_pawn":   5,
+        "black_knight": 5,
+        "black_bishop": 5,
+        "black_rook":   5,
+        "black_king":   5,
+        "black_queen":  5
+    },
+    "classic": {
+        "white_pawn":   5,
+        "white_knight": 3,
+        "white_bishop": 2,
+        "white_rook":   4,
+        "white_king":   0,
+        "white_queen":  1,
+        "black_pawn":   11,
+        "black_knight": 9,
+        "black_bishop": 8,
+        "black_rook":   10,
+        "black_king":   6,
+        "black_queen":  7
+    },
+}
+
+# number of square sizes to keep scaled sprites for
+SCALED_CACHE_SIZE = 4
 
 class Piece(pygame.sprite.Sprite):
-    def __init__(self, filename, cols, rows):
+    def __init__(self, filename, cols, rows, sprite_set="pawns", size=None):
         pygame.sprite.Sprite.__init__(self)
         # Load the spritesheet image for chess pieces
         self.spritesheet = pygame.image.load(filename).convert_alpha()
@@ -19,28 +60,42 @@ class Piece(pygame.sprite.Sprite):
         # Create a list of rectangles, each representing the position and size of a piece on the spritesheet
         self.cells = list([(i % cols * w, i // cols * h, w, h) for i in range(self.cell_count)])
 
-        # Mapping of piece names to their index on the spritesheet.
-        # ALL pieces are now mapped to the 'white_pawn' index (5).
-        # This makes every piece on the board appear as a white pawn.
-        # If you wanted them all to be black pawns, you would use index 11.
-        self.pieces = {
-            "white_pawn":   5,
-            "white_knight": 5, # Changed to white_pawn
-            "white_bishop": 5, # Changed to white_pawn
-            "white_rook":   5, # Changed to white_pawn
-            "white_king":   5, # Changed to white_pawn
-            "white_queen":  5, # Changed to white_pawn
-            "black_pawn":   5, # Changed to white_pawn (originally 11)
-            "black_knight": 5, # Changed to white_pawn
-            "black_bishop": 5, # Changed to white_pawn
-            "black_rook":   5, # Changed to white_pawn
-            "black_king":   5, # Changed to white_pawn
-            "black_queen":  5  # Changed to white_pawn
-        }
-
-    def draw(self, surface, piece_name, coords):
-        # Get the sprite index for the given piece name from the modified dictionary
-        piece_index = self.pieces[piece_name]
+        # Cut every cell out of the spritesheet once, as its own converted surface
+        self.sprites = [self.spritesheet.subsurface(cell).convert_alpha() for cell in self.cells]
+
+        # Scaled copies of self.sprites keyed by size, least recently used first
+        self.scaled_sprites = OrderedDict()
+
+        # Index on the spritesheet of every piece code, see bitboard.py
+        self.pieces = [0] * 16
+        for piece_name, piece_index in SPRITE_SETS[sprite_set].items():
+            self.pieces[PIECE_CODES[piece_name]] = piece_index
+
+        # Size pieces are drawn at, None to draw them at their size on the spritesheet
+        self.size = None
+        self.current = self.sprites
+        self.resize(size)
+
+    def resize(self, size):
+        # draw pieces scaled to size x size pixels from now on
+        self.size = size
+        if size is None:
+            self.current = self.sprites
+            return
+        scaled = self.scaled_sprites.get(size)
+        if scaled is None:
+            scaled = [pygame.transform.smoothscale(sprite, (size, size)) for sprite in self.sprites]
+            self.scaled_sprites[size] = scaled
+            # drop the size used longest ago
+            if len(self.scaled_sprites) > SCALED_CACHE_SIZE:
+                self.scaled_sprites.popitem(last=False)
+        else:
+            self.scaled_sprites.move_to_end(size)
+        self.current = scaled
+
+    def draw(self, surface, piece, coords):
+        # Get the sprite index for the given piece code from the sprite set
+        piece_index = self.pieces[piece]
         # Draw the piece onto the surface at the specified coordinates,
-        # using the calculated cell from the spritesheet.
-        surface.blit(self.spritesheet, coords, self.cells[piece_index])
+        # as a single blit of its pre-cut sprite.
+        surface.blit(self.current[piece_index], coords)
@@ -0,0 +1,178 @@
+import csv
+import json
+import time
+from collections import deque
+
+import pygame
+
+# frames kept for the HUD and the exported summary
+FRAME_HISTORY = 600
+# phases of a frame of the game loop, timed in this order
+PHASES = ("events", "logic", "render")
+# histogram buckets are powers of two microseconds, the last one collects the rest
+BUCKETS = 24
+
+
+class CallStats(object):
+    """Number of calls, total time and a latency histogram of a function"""
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        # bucket b counts calls that took less than 2 ** b microseconds
+        self.histogram = [0] * BUCKETS
+
+    def add(self, seconds):
+        self.calls += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.histogram[min(int(seconds * 1000000).bit_length(), BUCKETS - 1)] += 1
+
+    def percentile(self, fraction):
+        # estimated from the histogram as the upper bound of the bucket the
+        # call at that rank falls in, at most the slowest call
+        rank = int(self.calls * fraction)
+        count = 0
+        for bucket, calls in enumerate(self.histogram):
+            count += calls
+            if count > rank:
+                return min(1 << bucket, self.max * 1000000)
+        return self.max * 1000000
+
+    def summary(self):
+        return {
+            "calls": self.calls,
+            "total_ms": self.total * 1000,
+            "mean_us": self.total * 1000000 / self.calls if self.calls else 0.0,
+            "p50_us": self.percentile(0.5),
+            "p95_us": self.percentile(0.95),
+            "max_us": self.max * 1000000,
+            "histogram_us": {"<{}".format(1 << bucket): count
+                             for bucket, count in enumerate(self.histogram) if count},
+        }
+
+
+class Profiler(object):
+    """Opt-in frame timings and call counters for the game loop
+
+    Nothing is timed unless a Profiler is created: the game loop only calls it
+    when one exists, and instrument() wraps methods of single objects, which
+    are left untouched otherwise."""
+    def __init__(self):
+        # {phase: seconds} of the last frames
+        self.frames = deque(maxlen=FRAME_HISTORY)
+        self.frame = None
+        self.lap_start = 0.0
+        # CallStats by label
+        self.calls = {}
+        # (object, method name) of every wrapped method, see restore
+        self.instrumented = []
+        # show the HUD overlay
+        self.hud = True
+
+    def begin_frame(self):
+        self.frame = {}
+        self.lap_start = time.perf_counter()
+
+    def lap(self, phase):
+        # time since the previous lap, added to a phase of the current frame
+        now = time.perf_counter()
+        self.frame[phase] = self.frame.get(phase, 0.0) + now - self.lap_start
+        self.lap_start = now
+
+    def end_frame(self):
+        self.frame["total"] = sum(self.frame.values())
+        self.frames.append(self.frame)
+        self.frame = None
+
+    def instrument(self, obj, name, label=None):
+        # time every call of obj.name, only for this object
+        method = getattr(obj, name)
+        stats = self.calls.setdefault(label or name, CallStats())
+        perf_counter = time.perf_counter
+
+        def timed(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                stats.add(perf_counter() - start)
+
+        setattr(obj, name, timed)
+        self.instrumented.append((obj, name))
+
+    def restore(self):
+        # remove the wrappers, the objects use their class methods again
+        for obj, name in self.instrumented:
+            delattr(obj, name)
+        self.instrumented = []
+
+    def frame_summary(self):
+        # mean, median, 95th percentile and max milliseconds of every phase
+        summary = {}
+        for phase in PHASES + ("total",):
+            times = sorted(frame.get(phase, 0.0) * 1000 for frame in self.frames)
+            if not times:
+                continue
+            summary[phase] = {
+                "mean_ms": sum(times) / len(times),
+                "p50_ms": times[len(times) // 2],
+                "p95_ms": times[len(times) * 95 // 100],
+                "max_ms": times[-1],
+            }
+        return summary
+
+    def report(self):
+        return {
+            "frames": len(self.frames),
+            "frame_ms": self.frame_summary(),
+            "calls": {label: stats.summary() for label, stats in sorted(self.calls.items())},
+        }
+
+    def export(self, path):
+        # write the report as JSON, or as CSV when the path ends in .csv
+        report = self.report()
+        if not path.endswith(".csv"):
+            with open(path, "w") as file:
+                json.dump(report, file, indent=2)
+            return
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            # one column per histogram bucket, empty for the frame phases
+            buckets = ["<{}".format(1 << bucket) for bucket in range(BUCKETS)]
+            writer.writerow(["name", "calls", "total_ms", "mean_us", "p50_us", "p95_us", "max_us"] +
+                            ["histogram_us " + bucket for bucket in buckets])
+            for phase, times in report["frame_ms"].items():
+                writer.writerow(["frame." + phase, report["frames"], "",
+                                 times["mean_ms"] * 1000, times["p50_ms"] * 1000,
+                                 times["p95_ms"] * 1000, times["max_ms"] * 1000])
+            for label, stats in report["calls"].items():
+                writer.writerow([label, stats["calls"], stats["total_ms"], stats["mean_us"],
+                                 stats["p50_us"], stats["p95_us"], stats["max_us"]] +
+                                [stats["histogram_us"].get(bucket, 0) for bucket in buckets])
+
+    def hud_lines(self):
+        lines = []
+        summary = self.frame_summary()
+        if "total" in summary:
+            lines.append("frame {:.2f} ms p95 {:.2f} ms  ".format(
+                summary["total"]["mean_ms"], summary["total"]["p95_ms"]) +
+                " ".join("{} {:.2f}".format(phase, summary[phase]["mean_ms"])
+                         for phase in PHASES if phase in summary))
+        lines.append("  ".join("{} {}x {:.0f}us".format(label, stats.calls,
+                                                        stats.total * 1000000 / stats.calls)
+                               for label, stats in sorted(self.calls.items()) if stats.calls))
+        return lines
+
+    def draw_hud(self, surface, render_cache, rect):
+        # draw the HUD into a screen rect, returns the rect to update
+        surface.fill((0, 0, 0), rect)
+        y = rect.y
+        font = render_cache.font(14, "monospace")
+        for line in self.hud_lines():
+            # the numbers change every frame, so the labels are not cached
+            label = font.render(line, True, (255, 255, 0))
+            surface.blit(label, (rect.x, y), pygame.Rect(0, 0, rect.width, rect.height))
+            y += label.get_height()
+        return rect
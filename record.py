@@ -0,0 +1,132 @@
+import mmap
+import struct
+import sys
+from array import array
+
+# Binary game records.
+#
+# A record file is a sequence of games, each stored as a 6 byte header
+# followed by its moves:
+#   magic        2 bytes  b"GR"
+#   first player 1 byte   0 = white, 1 = black
+#   result       1 byte   one of the RESULT_ values below
+#   move count   2 bytes  unsigned, little endian
+#   moves        2 bytes each, little endian
+# A move is bitboard.encode_move(src, dst) (12 bits) with CAPTURE_FLAG set
+# when it took a piece.
+GAME_HEADER = struct.Struct("<2sBBH")
+GAME_MAGIC = b"GR"
+CAPTURE_FLAG = 1 << 12
+MOVE_MASK = CAPTURE_FLAG - 1
+
+RESULT_UNFINISHED = 0
+RESULT_WHITE = 1
+RESULT_BLACK = 2
+RESULT_DRAW = 3
+
+# Board.winner values for each result
+WINNERS = {RESULT_UNFINISHED: "", RESULT_WHITE: "White", RESULT_BLACK: "Black", RESULT_DRAW: "Draw"}
+RESULTS = {winner: result for result, winner in WINNERS.items()}
+
+PLAYERS = ("white", "black")
+
+
+class GameRecordWriter(object):
+    """Appends games to a record file through a write buffer"""
+    def __init__(self, path, buffer_size=1 << 16):
+        self.file = open(path, "ab", buffering=buffer_size)
+        # first player and moves of the game being recorded, None between games
+        self.first_player = None
+        self.moves = array("H")
+
+    def begin_game(self, first_player):
+        # finish any game still open, then start recording a new one
+        self.end_game()
+        self.first_player = first_player
+        self.moves = array("H")
+
+    def append(self, move, capture=False):
+        if self.first_player is not None:
+            self.moves.append(move | CAPTURE_FLAG if capture else move)
+
+    def end_game(self, winner=""):
+        # write the game being recorded, winner is a Board.winner value
+        if self.first_player is None:
+            return
+        first_player = self.first_player
+        self.first_player = None
+        # nothing worth keeping before the first move
+        if len(self.moves) == 0:
+            return
+        moves = self.moves
+        if sys.byteorder != "little":
+            moves = array("H", moves)
+            moves.byteswap()
+        self.file.write(GAME_HEADER.pack(GAME_MAGIC, PLAYERS.index(first_player),
+                                         RESULTS[winner], len(moves)))
+        self.file.write(moves.tobytes())
+
+    def close(self):
+        self.end_game()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class GameRecordReader(object):
+    """Iterates over the games of a record file through a memory map"""
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        # an empty file cannot be mapped
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if self.size() else b""
+
+    def size(self):
+        self.file.seek(0, 2)
+        return self.file.tell()
+
+    def __iter__(self):
+        # yields (first player, winner, moves); moves is a read-only view of
+        # the mapped file as unsigned 16-bit ints, valid until close()
+        data = memoryview(self.map)
+        offset = 0
+        end = len(data)
+        while offset < end:
+            magic, first, result, count = GAME_HEADER.unpack_from(data, offset)
+            if magic != GAME_MAGIC:
+                raise ValueError("corrupt game record at byte {}".format(offset))
+            offset += GAME_HEADER.size
+            moves = data[offset:offset + 2 * count]
+            if sys.byteorder == "little":
+                moves = moves.cast("H")
+            else:
+                moves = array("H", moves.tobytes())
+                moves.byteswap()
+            yield PLAYERS[first], WINNERS[result], moves
+            offset += 2 * count
+
+    def close(self):
+        if isinstance(self.map, mmap.mmap):
+            try:
+                self.map.close()
+            except BufferError:
+                # move views are still in use, the map closes when they are freed
+                pass
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def replay(board, first_player, moves):
+    # set up the starting position and play a recorded game on a Board
+    board.reset(first_player)
+    for move in moves:
+        board.make_move(move & MOVE_MASK)
+    return board
@@ -0,0 +1,48 @@
+import pygame
+
+
+class RenderCache(object):
+    """Fonts, rendered text and overlay surfaces, created once and reused every frame"""
+    def __init__(self):
+        # pygame.font.Font objects keyed by (name, size)
+        self.fonts = {}
+        # rendered text surfaces keyed by (text, name, size, antialias, color)
+        self.labels = {}
+        # filled transparent surfaces keyed by (color, size)
+        self.overlays = {}
+
+    def font(self, size, name="comicsansms"):
+        key = (name, size)
+        font = self.fonts.get(key)
+        if font is None:
+            # SysFont looks the font up on the system, only do it once
+            font = self.fonts[key] = pygame.font.SysFont(name, size)
+        return font
+
+    def text(self, text, size, color, antialias=True, name="comicsansms"):
+        # a new surface is only rendered when the text, font or color changes
+        key = (text, name, size, antialias, color)
+        label = self.labels.get(key)
+        if label is None:
+            label = self.labels[key] = self.render(self.font(size, name), text, antialias, color)
+        return label
+
+    def render(self, font, text, antialias, color):
+        # every Font.render of the cache goes through here, so the profiler
+        # can count them apart from the lookups that hit the cache
+        return font.render(text, antialias, color)
+
+    def overlay(self, color, size):
+        # transparent surface of the given (width, height) filled with an RGBA color
+        key = (color, size)
+        surface = self.overlays.get(key)
+        if surface is None:
+            surface = pygame.Surface(size, pygame.SRCALPHA)
+            surface.fill(color)
+            self.overlays[key] = surface
+        return surface
+
+    def clear(self):
+        self.fonts.clear()
+        self.labels.clear()
+        self.overlays.clear()
@@ -0,0 +1,239 @@
+import argparse
+import asyncio
+import itertools
+
+from board import Board
+from bitboard import square, location, encode_move, COLOR_BITS, BLACK
+from notation import to_fen
+
+# Line protocol, one command or message per line with space separated words.
+#
+# client to server:
+#   CREATE [white|black]          start a game, the first player is random unless given
+#   JOIN <game> white|black|any   play a color of a game
+#   WATCH <game>                  follow a game as a spectator
+#   MOVE <game> <e2e4>            play a move, only on the player's turn
+#   LEAVE <game>
+# server to client:
+#   GAME <game>                   reply to CREATE
+#   JOINED <game> <color>         reply to JOIN and WATCH, the color is "watch" for spectators
+#   STATE <game> <ply> <fen>      position after the given number of plies, sent after JOINED
+#   MOVED <game> <ply> <e2e4>     a move was played, sent to everyone in the game
+#   OVER <game> <winner>          the game was won or drawn, winner is White, Black or Draw
+#   ERROR <message>
+PORT = 8765
+COLORS = ("white", "black")
+# bytes waiting to be sent to a client before it is dropped for not reading
+MAX_BUFFERED = 1 << 20
+# games a client may have created that nobody has joined yet
+MAX_OPEN_GAMES = 16
+
+
+class ProtocolError(Exception):
+    """A command that cannot be carried out, sent back as an ERROR line"""
+
+
+def parse_square(text):
+    # bit index of a board location such as "e2"
+    if len(text) != 2 or text[0] not in "abcdefgh" or text[1] not in "12345678":
+        raise ProtocolError("invalid square {}".format(text))
+    return square(ord(text[0]) - 97, 8 - int(text[1]))
+
+
+def format_move(move):
+    return location(move & 63) + location(move >> 6)
+
+
+def parse_move(text):
+    return encode_move(parse_square(text[:2]), parse_square(text[2:]))
+
+
+class Connection(object):
+    """A connected client and the games it takes part in"""
+    def __init__(self, writer):
+        self.writer = writer
+        # color played in every joined game, "watch" for spectated games
+        self.games = {}
+        # ids of the games this client created, freed on disconnect while empty
+        self.created = set()
+
+    def send(self, line):
+        if self.writer.is_closing():
+            return
+        self.writer.write(line.encode() + b"\n")
+        # only the sender of a command waits for its output to drain, so a
+        # spectator that stops reading is dropped instead of buffering forever
+        if self.writer.transport.get_write_buffer_size() > MAX_BUFFERED:
+            self.writer.transport.abort()
+
+
+class ServerGame(object):
+    """A game hosted by the server, with its players and spectators"""
+    def __init__(self, game_id, first_player=None):
+        self.id = game_id
+        self.board = Board()
+        self.board.reset(first_player)
+        # connection playing each color, None while the seat is free
+        self.players = {"white": None, "black": None}
+        self.spectators = set()
+
+    def connections(self):
+        return [player for player in self.players.values() if player is not None] + list(self.spectators)
+
+    def broadcast(self, line):
+        for connection in self.connections():
+            connection.send(line)
+
+
+class GameServer(object):
+    """Hosts many games on headless boards for clients of the line protocol"""
+    def __init__(self):
+        self.games = {}
+        self.ids = itertools.count(1)
+        # (handler, fewest arguments, most arguments) of every command
+        self.commands = {
+            "CREATE": (self.create, 0, 1),
+            "JOIN": (self.join, 2, 2),
+            "WATCH": (self.watch, 1, 1),
+            "MOVE": (self.move, 2, 2),
+            "LEAVE": (self.leave, 1, 1),
+        }
+
+    async def handle(self, reader, writer):
+        # serve one client until it disconnects
+        connection = Connection(writer)
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # the line is longer than the stream limit
+                    connection.send("ERROR line too long")
+                    break
+                if not line:
+                    break
+                words = line.decode("utf-8", "replace").split()
+                if not words:
+                    continue
+                try:
+                    command = self.commands.get(words[0].upper())
+                    if command is None:
+                        raise ProtocolError("unknown command {}".format(words[0]))
+                    handler, fewest, most = command
+                    if not fewest <= len(words) - 1 <= most:
+                        raise ProtocolError("wrong number of arguments for {}".format(words[0]))
+                    handler(connection, *words[1:])
+                except ProtocolError as error:
+                    connection.send("ERROR {}".format(error))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            for game_id in list(connection.games):
+                self.leave(connection, game_id)
+            for game_id in self.open_games(connection):
+                del self.games[game_id]
+            writer.close()
+
+    def game(self, connection, game_id, joined=True):
+        game = self.games.get(game_id)
+        if game is None or (joined and game_id not in connection.games):
+            raise ProtocolError("no game {}".format(game_id))
+        return game
+
+    def open_games(self, connection):
+        # games created by the connection that nobody takes part in yet
+        connection.created = set(game_id for game_id in connection.created
+                                 if game_id in self.games and not self.games[game_id].connections())
+        return connection.created
+
+    def create(self, connection, first_player=None):
+        if first_player is not None and first_player not in COLORS:
+            raise ProtocolError("invalid color {}".format(first_player))
+        if len(self.open_games(connection)) >= MAX_OPEN_GAMES:
+            raise ProtocolError("too many open games")
+        game_id = str(next(self.ids))
+        self.games[game_id] = ServerGame(game_id, first_player)
+        connection.created.add(game_id)
+        connection.send("GAME {}".format(game_id))
+
+    def join(self, connection, game_id, color):
+        game = self.game(connection, game_id, joined=False)
+        if color == "any":
+            free = [color for color in COLORS if game.players[color] is None]
+            if not free:
+                raise ProtocolError("game {} is full".format(game_id))
+            color = free[0]
+        if color not in COLORS:
+            raise ProtocolError("invalid color {}".format(color))
+        if game.players[color] is not None or game_id in connection.games:
+            raise ProtocolError("{} is taken in game {}".format(color, game_id))
+        game.players[color] = connection
+        self.joined(connection, game, color)
+
+    def watch(self, connection, game_id):
+        game = self.game(connection, game_id, joined=False)
+        if game_id in connection.games:
+            raise ProtocolError("already in game {}".format(game_id))
+        game.spectators.add(connection)
+        self.joined(connection, game, "watch")
+
+    def joined(self, connection, game, color):
+        connection.games[game.id] = color
+        connection.send("JOINED {} {}".format(game.id, color))
+        connection.send("STATE {} {} {}".format(game.id, len(game.board.history), to_fen(game.board)))
+        if len(game.board.winner) > 0:
+            connection.send("OVER {} {}".format(game.id, game.board.winner))
+
+    def move(self, connection, game_id, text):
+        game = self.game(connection, game_id)
+        board = game.board
+        if len(board.winner) > 0:
+            raise ProtocolError("game {} is over".format(game_id))
+        color = connection.games[game_id]
+        if color != board.side_to_move():
+            raise ProtocolError("not your turn in game {}".format(game_id))
+        move = parse_move(text)
+        # the rules engine decides what is a legal move
+        piece = board.bitboard.board[move & 63]
+        if (not piece or piece & BLACK != COLOR_BITS[color] or
+                not board.bitboard.legal_targets(piece, move & 63) >> (move >> 6) & 1):
+            raise ProtocolError("illegal move {} in game {}".format(text, game_id))
+        board.make_move(move)
+        board.update_winner()
+        game.broadcast("MOVED {} {} {}".format(game_id, len(board.history), format_move(move)))
+        if len(board.winner) > 0:
+            game.broadcast("OVER {} {}".format(game_id, board.winner))
+
+    def leave(self, connection, game_id):
+        game = self.game(connection, game_id)
+        color = connection.games.pop(game_id)
+        if color == "watch":
+            game.spectators.discard(connection)
+        else:
+            game.players[color] = None
+        # forget games nobody takes part in any more
+        if not game.connections():
+            del self.games[game_id]
+
+
+async def serve(host, port):
+    server = GameServer()
+    listener = await asyncio.start_server(server.handle, host, port)
+    async with listener:
+        await listener.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Host games for network players")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=PORT)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,389 @@
+import argparse
+import mmap
+import multiprocessing
+import os
+import struct
+from array import array
+
+from bitboard import BitBoard, squares, PIECE_CODES, COLOR_BITS, BLACK
+
+# Endgame tables solved by retrograde analysis.
+#
+# A table covers every placement of a fixed set of pieces, named by a
+# signature such as "KQvK": the white pieces, "v", then the black pieces,
+# each side listed in KQRBNP order and holding exactly one king. Position
+# index = ((side * 64 + square of piece 0) * 64 + square of piece 1) ...
+# in signature order, with side 0 for white to move and 1 for black.
+#
+# A table file is a header followed by two sections:
+#   header  4 bytes magic b"TBL2", 4 bytes number of positions
+#   wdl     2 bits per position, four positions per byte, lowest bits first
+#   dtm     1 byte per position, plies until checkmate
+# Captures that leave fewer pieces are looked up in the smaller tables, which
+# are generated first.
+TABLE_HEADER = struct.Struct("<4sI")
+TABLE_MAGIC = b"TBL2"
+
+# result for the side to move
+DRAW = 0
+WIN = 1
+LOSS = 2
+# two pieces on the same square, or the side not to move in check
+INVALID = 3
+
+PIECE_LETTERS = {"king": "K", "queen": "Q", "rook": "R", "bishop": "B", "knight": "N", "pawn": "P"}
+LETTER_PIECES = {letter: kind for kind, letter in PIECE_LETTERS.items()}
+LETTER_ORDER = "KQRBNP"
+
+# positions solved by one process at a time during the forward pass
+CHUNK_POSITIONS = 1 << 16
+# checkpoint of a solved chunk: positions, successors, then the arrays
+CHUNK_HEADER = struct.Struct("<II")
+
+
+def piece_names(signature):
+    # piece names of a signature in index order
+    white, _, black = signature.upper().partition("V")
+    names = []
+    for color, letters in (("white", white), ("black", black)):
+        if letters.count("K") != 1:
+            raise ValueError("every side needs one king: {}".format(signature))
+        if sorted(letters, key=LETTER_ORDER.index) != list(letters):
+            raise ValueError("pieces must be listed in {} order: {}".format(LETTER_ORDER, signature))
+        for letter in letters:
+            if letter not in LETTER_PIECES:
+                raise ValueError("unknown piece {} in {}".format(letter, signature))
+            names.append(color + "_" + LETTER_PIECES[letter])
+    return names
+
+
+def signature_of(names):
+    # signature of piece names given in index order
+    white = "".join(PIECE_LETTERS[name[6:]] for name in names if name[:5] == "white")
+    black = "".join(PIECE_LETTERS[name[6:]] for name in names if name[:5] == "black")
+    return white + "v" + black
+
+
+def table_size(names):
+    return 2 * 64 ** len(names)
+
+
+def encode_index(black_to_move, piece_squares):
+    index = int(black_to_move)
+    for sq in piece_squares:
+        index = index * 64 + sq
+    return index
+
+
+def decode_index(index, pieces):
+    # (black to move, [square of every piece])
+    piece_squares = [0] * pieces
+    for i in range(pieces - 1, -1, -1):
+        piece_squares[i] = index & 63
+        index >>= 6
+    return index, piece_squares
+
+
+def subtables(names):
+    # signatures of the tables reached by capturing one piece other than a king
+    return sorted({signature_of(names[:j] + names[j + 1:])
+                   for j, name in enumerate(names) if name[6:] != "king"})
+
+
+class Tablebases(object):
+    """Solved tables of a directory, probed through memory maps"""
+    def __init__(self, directory):
+        self.directory = directory
+        # open tables by signature, as (file, map)
+        self.tables = {}
+        self.signatures = set()
+        if os.path.isdir(directory):
+            for filename in os.listdir(directory):
+                if filename.endswith(".tbl"):
+                    self.signatures.add(filename[:-4])
+        # largest number of pieces covered
+        self.max_pieces = max([len(piece_names(signature)) for signature in self.signatures] or [0])
+
+    def path(self, signature):
+        return os.path.join(self.directory, signature + ".tbl")
+
+    def table(self, signature):
+        if signature not in self.tables:
+            file = open(self.path(signature), "rb")
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            if data[:len(TABLE_MAGIC)] != TABLE_MAGIC:
+                data.close()
+                file.close()
+                raise ValueError("{} is not a table of this version".format(self.path(signature)))
+            self.tables[signature] = (file, data)
+        return self.tables[signature][1]
+
+    def probe_index(self, signature, index):
+        # (wdl, dtm) of a position of a table
+        data = self.table(signature)
+        _, size = TABLE_HEADER.unpack_from(data, 0)
+        wdl = (data[TABLE_HEADER.size + (index >> 2)] >> ((index & 3) * 2)) & 3
+        dtm = data[TABLE_HEADER.size + (size + 3) // 4 + index]
+        return wdl, dtm
+
+    def probe(self, board):
+        # (wdl, dtm) of the side to move, or None for positions not covered
+        bb = board.bitboard
+        if len(board.winner) > 0 or bin(bb.occupied).count("1") > self.max_pieces:
+            return None
+        names = []
+        piece_squares = []
+        for color in ("white", "black"):
+            for letter in LETTER_ORDER:
+                name = color + "_" + LETTER_PIECES[letter]
+                for sq in squares(bb.pieces[PIECE_CODES[name]]):
+                    names.append(name)
+                    piece_squares.append(sq)
+        signature = signature_of(names)
+        if signature not in self.signatures:
+            return None
+        return self.probe_index(signature, encode_index(board.turn["black"], piece_squares))
+
+    def close(self):
+        for file, data in self.tables.values():
+            data.close()
+            file.close()
+        self.tables = {}
+
+
+def solve_chunk(task):
+    # forward pass over the positions [start, end) of a table, written to a
+    # checkpoint file: for every position the best results reached through
+    # captures and the in-table positions reached by the other moves
+    directory, signature, start, end = task
+    names = piece_names(signature)
+    codes = [PIECE_CODES[name] for name in names]
+    pieces = len(names)
+    tables = Tablebases(directory)
+    bb = BitBoard()
+
+    count = end - start
+    # shortest win through a capture, 0 for none
+    wins = array("H", bytes(2 * count))
+    # longest loss through a capture, 0 for none
+    losses = array("H", bytes(2 * count))
+    # 1 when a capture draws, 2 for invalid positions, 3 when checkmated
+    draws = bytearray(count)
+    offsets = array("I", [0])
+    successors = array("I")
+
+    for index in range(start, end):
+        position = index - start
+        black_to_move, piece_squares = decode_index(index, pieces)
+        if len(set(piece_squares)) < pieces:
+            draws[position] = 2
+            offsets.append(len(successors))
+            continue
+        turn = "black" if black_to_move else "white"
+        bb.clear()
+        for piece, sq in zip(codes, piece_squares):
+            bb.put(piece, sq)
+        bb.refresh()
+        # the side that just moved cannot have left its king in check
+        if bb.in_check("white" if black_to_move else "black"):
+            draws[position] = 2
+            offsets.append(len(successors))
+            continue
+
+        moves = 0
+        for i, piece in enumerate(codes):
+            if piece & BLACK != COLOR_BITS[turn]:
+                continue
+            for dst in squares(bb.legal_targets(piece, piece_squares[i])):
+                moves += 1
+                moved = list(piece_squares)
+                moved[i] = dst
+                if not bb.board[dst]:
+                    successors.append(encode_index(not black_to_move, moved))
+                    continue
+                j = piece_squares.index(dst)
+                wdl, dtm = tables.probe_index(signature_of(names[:j] + names[j + 1:]),
+                                              encode_index(not black_to_move, moved[:j] + moved[j + 1:]))
+                if wdl == LOSS:
+                    if wins[position] == 0 or dtm + 1 < wins[position]:
+                        wins[position] = dtm + 1
+                elif wdl == WIN:
+                    losses[position] = max(losses[position], dtm + 1)
+                else:
+                    draws[position] = 1
+        # without a move the game ends, stalemate is left a draw
+        if moves == 0 and bb.in_check(turn):
+            draws[position] = 3
+        offsets.append(len(successors))
+    tables.close()
+
+    path = chunk_path(directory, signature, start)
+    with open(path + ".tmp", "wb") as file:
+        file.write(CHUNK_HEADER.pack(count, len(successors)))
+        wins.tofile(file)
+        losses.tofile(file)
+        file.write(draws)
+        offsets.tofile(file)
+        successors.tofile(file)
+    # a chunk file only exists once complete, so generation can resume after it
+    os.replace(path + ".tmp", path)
+    return start
+
+
+def chunk_path(directory, signature, start):
+    return os.path.join(directory, "{}.part{}".format(signature, start))
+
+
+def read_chunk(path):
+    with open(path, "rb") as file:
+        count, successor_count = CHUNK_HEADER.unpack(file.read(CHUNK_HEADER.size))
+        wins, losses, offsets, successors = array("H"), array("H"), array("I"), array("I")
+        wins.fromfile(file, count)
+        losses.fromfile(file, count)
+        draws = bytearray(file.read(count))
+        offsets.fromfile(file, count + 1)
+        successors.fromfile(file, successor_count)
+    return wins, losses, draws, offsets, successors
+
+
+def propagate(size, wins, losses, draws, offsets, successors):
+    # retrograde pass: resolve positions in order of distance, starting from
+    # the checkmates and the ones decided by captures, and return (wdl, dtm)
+    # bytearrays
+    wdl = bytearray(size)
+    dtm = bytearray(size)
+    resolved = bytearray(size)
+
+    # predecessors of every position, in the same layout as the successors
+    starts = array("I", bytes(4 * (size + 1)))
+    for successor in successors:
+        starts[successor + 1] += 1
+    for index in range(size):
+        starts[index + 1] += starts[index]
+    filled = array("I", starts)
+    predecessors = array("I", bytes(4 * len(successors)))
+    for index in range(size):
+        for k in range(offsets[index], offsets[index + 1]):
+            successor = successors[k]
+            predecessors[filled[successor]] = index
+            filled[successor] += 1
+    del filled
+
+    # in-table moves not yet known to lose
+    remaining = array("H", (offsets[index + 1] - offsets[index] for index in range(size)))
+    # positions to resolve, by distance, as (index, result)
+    buckets = {}
+    for index in range(size):
+        if draws[index] == 2:
+            wdl[index] = INVALID
+            resolved[index] = 1
+        elif draws[index] == 3:
+            buckets.setdefault(0, []).append((index, LOSS))
+        elif wins[index]:
+            buckets.setdefault(wins[index], []).append((index, WIN))
+        elif remaining[index] == 0:
+            if losses[index] and not draws[index]:
+                buckets.setdefault(losses[index], []).append((index, LOSS))
+            else:
+                # no moves or a drawing capture
+                resolved[index] = 1
+
+    distance = -1
+    while buckets:
+        distance += 1
+        for index, result in buckets.pop(distance, ()):
+            if resolved[index]:
+                continue
+            resolved[index] = 1
+            wdl[index] = result
+            dtm[index] = min(distance, 255)
+            for k in range(starts[index], starts[index + 1]):
+                parent = predecessors[k]
+                if resolved[parent]:
+                    continue
+                if result == LOSS:
+                    buckets.setdefault(distance + 1, []).append((parent, WIN))
+                    continue
+                remaining[parent] -= 1
+                # every move loses, unless a capture wins or draws
+                if remaining[parent] == 0 and not wins[parent] and not draws[parent]:
+                    buckets.setdefault(max(distance + 1, losses[parent]), []).append((parent, LOSS))
+    # positions never resolved are draws, wdl is already 0
+    return wdl, dtm
+
+
+def write_table(path, wdl, dtm):
+    size = len(wdl)
+    packed = bytearray((size + 3) // 4)
+    for index in range(size):
+        if wdl[index]:
+            packed[index >> 2] |= wdl[index] << ((index & 3) * 2)
+    with open(path + ".tmp", "wb") as file:
+        file.write(TABLE_HEADER.pack(TABLE_MAGIC, size))
+        file.write(packed)
+        file.write(dtm)
+    os.replace(path + ".tmp", path)
+
+
+def generate(signature, directory, processes=None, chunk_positions=CHUNK_POSITIONS, log=print):
+    # solve a table and every table it captures into, skipping the solved
+    # ones and the chunks already checkpointed by an interrupted run
+    names = piece_names(signature)
+    signature = signature_of(names)
+    path = os.path.join(directory, signature + ".tbl")
+    if os.path.exists(path):
+        return path
+    for subtable in subtables(names):
+        generate(subtable, directory, processes, chunk_positions, log)
+    os.makedirs(directory, exist_ok=True)
+
+    size = table_size(names)
+    starts = range(0, size, chunk_positions)
+    tasks = [(directory, signature, start, min(start + chunk_positions, size)) for start in starts
+             if not os.path.exists(chunk_path(directory, signature, start))]
+    log("{}: {} positions, {} of {} chunks to solve".format(signature, size, len(tasks), len(starts)))
+    if processes == 1:
+        for task in tasks:
+            solve_chunk(task)
+    elif tasks:
+        with multiprocessing.Pool(processes) as pool:
+            for done, _ in enumerate(pool.imap_unordered(solve_chunk, tasks), 1):
+                log("{}: {}/{} chunks".format(signature, done, len(tasks)))
+
+    # join the checkpoints
+    wins, losses, offsets, successors = array("H"), array("H"), array("I", [0]), array("I")
+    draws = bytearray()
+    for start in starts:
+        chunk = read_chunk(chunk_path(directory, signature, start))
+        wins.extend(chunk[0])
+        losses.extend(chunk[1])
+        draws.extend(chunk[2])
+        base = len(successors)
+        offsets.extend(base + offset for offset in chunk[3][1:])
+        successors.extend(chunk[4])
+
+    wdl, dtm = propagate(size, wins, losses, draws, offsets, successors)
+    write_table(path, wdl, dtm)
+    for start in starts:
+        os.remove(chunk_path(directory, signature, start))
+    log("{}: {} wins, {} losses, {} draws".format(
+        signature, wdl.count(WIN), wdl.count(LOSS), size - wdl.count(WIN) - wdl.count(LOSS) -
+        wdl.count(INVALID)))
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate endgame tables by retrograde analysis")
+    parser.add_argument("signatures", nargs="+", help='piece sets such as "KQvK"')
+    parser.add_argument("--directory", default="tablebases", help="where the tables are written")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="worker processes, all cores by default")
+    parser.add_argument("--chunk", type=int, default=CHUNK_POSITIONS,
+                        help="positions per checkpointed chunk")
+    args = parser.parse_args()
+    for signature in args.signatures:
+        generate(signature, args.directory, args.processes, args.chunk)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+import argparse
+import csv
+import multiprocessing
+import random
+import time
+
+from board import Board
+from bitboard import KIND
+from engine import Engine
+from evaluation import KIND_VALUES
+from record import GameRecordWriter, CAPTURE_FLAG
+
+# games longer than this many plies are drawn
+MAX_PLIES = 200
+# a position seen this many times before is drawn
+REPETITIONS = 2
+# games handed to a process at a time
+CHUNK_SIZE = 16
+
+
+class RandomPolicy(object):
+    """Plays a random move"""
+    def choose(self, board, moves, rng):
+        return rng.choice(moves)
+
+
+class GreedyPolicy(object):
+    """Captures the most valuable piece it can, otherwise plays a random move"""
+    def choose(self, board, moves, rng):
+        bb = board.bitboard.board
+        best = 0
+        captures = []
+        for move in moves:
+            victim = bb[move >> 6]
+            if not victim:
+                continue
+            value = KIND_VALUES[victim & KIND]
+            if value > best:
+                best = value
+                captures = [move]
+            elif value == best:
+                captures.append(move)
+        return rng.choice(captures if captures else moves)
+
+
+class SearchPolicy(object):
+    """Plays the move of a fixed depth engine search"""
+    def __init__(self, depth):
+        # no clock, so the same position always gets the same move
+        self.engine = Engine(time_limit=None, max_depth=depth, tt_megabytes=1)
+
+    def choose(self, board, moves, rng):
+        return self.engine.search(board)
+
+
+def make_policy(spec):
+    # "random", "greedy" or "search:<depth>"
+    if spec == "random":
+        return RandomPolicy()
+    if spec == "greedy":
+        return GreedyPolicy()
+    if spec.startswith("search:"):
+        return SearchPolicy(int(spec[7:]))
+    raise ValueError("unknown policy: {}".format(spec))
+
+
+def play_game(task):
+    # play one game, task is (game number, seed, white policy, black policy,
+    # random opening plies, max plies) and the result is a dictionary
+    number, seed, white, black, opening_plies, max_plies = task
+    start = time.perf_counter()
+    rng = random.Random(seed)
+    # new policies for every game so no state leaks between games
+    policies = {"white": make_policy(white), "black": make_policy(black)}
+    board = Board()
+    board.reset(rng.choice(("white", "black")))
+    first_player = board.side_to_move()
+
+    moves = []
+    winner = ""
+    while len(winner) == 0:
+        if len(moves) >= max_plies or board.repetitions() >= REPETITIONS:
+            winner = "Draw"
+            break
+        legal = board.legal_moves()
+        if not legal:
+            winner = "Draw"
+            break
+        if len(moves) < opening_plies:
+            move = rng.choice(legal)
+        else:
+            move = policies[board.side_to_move()].choose(board, legal, rng)
+        capture = board.bitboard.board[move >> 6] != 0
+        board.make_move(move)
+        board.update_winner()
+        # moves are kept in the game record encoding, see record.py
+        moves.append(move | CAPTURE_FLAG if capture else move)
+        winner = board.winner
+
+    return {
+        "game": number,
+        "seed": seed,
+        "white": white,
+        "black": black,
+        "first": first_player,
+        "winner": winner,
+        "plies": len(moves),
+        "time": time.perf_counter() - start,
+        "moves": moves,
+    }
+
+
+def tournament_tasks(player, opponent, games, seed, opening_plies=0, max_plies=MAX_PLIES):
+    # the two policies swap colours every game
+    for number in range(games):
+        white, black = (player, opponent) if number % 2 == 0 else (opponent, player)
+        yield number, seed * 1000003 + number, white, black, opening_plies, max_plies
+
+
+def run_tournament(player, opponent, games, seed=0, processes=None, opening_plies=0,
+                   max_plies=MAX_PLIES):
+    # yield game results as they finish, played by a pool of processes
+    tasks = tournament_tasks(player, opponent, games, seed, opening_plies, max_plies)
+    if processes == 1:
+        for task in tasks:
+            yield play_game(task)
+        return
+    with multiprocessing.Pool(processes) as pool:
+        for result in pool.imap_unordered(play_game, tasks, CHUNK_SIZE):
+            yield result
+
+
+def score(results):
+    # wins, draws and losses of the first policy, which is white in even games
+    wins = draws = losses = 0
+    for result in results:
+        if result["winner"] == "Draw":
+            draws += 1
+        elif result["winner"] == ("White" if result["game"] % 2 == 0 else "Black"):
+            wins += 1
+        else:
+            losses += 1
+    return wins, draws, losses
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play games between two move policies")
+    parser.add_argument("player", help='"random", "greedy" or "search:<depth>"')
+    parser.add_argument("opponent", help='"random", "greedy" or "search:<depth>"')
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0, help="base seed, game n uses its own seed")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="worker processes, all cores by default")
+    parser.add_argument("--opening-plies", type=int, default=0,
+                        help="random moves at the start of every game")
+    parser.add_argument("--max-plies", type=int, default=MAX_PLIES,
+                        help="longer games are drawn")
+    parser.add_argument("--output", metavar="CSV", help="write the result of every game")
+    parser.add_argument("--record", metavar="PATH", help="append the games to a game record file")
+    args = parser.parse_args()
+    # fail before starting the pool on a bad policy
+    make_policy(args.player)
+    make_policy(args.opponent)
+
+    fields = ["game", "seed", "white", "black", "first", "winner", "plies", "time"]
+    output = open(args.output, "w", newline="") if args.output else None
+    writer = csv.DictWriter(output, fields, extrasaction="ignore") if output else None
+    if writer is not None:
+        writer.writeheader()
+    recorder = GameRecordWriter(args.record) if args.record else None
+
+    start = time.perf_counter()
+    results = []
+    for result in run_tournament(args.player, args.opponent, args.games, args.seed,
+                                 args.processes, args.opening_plies, args.max_plies):
+        if writer is not None:
+            writer.writerow(result)
+        if recorder is not None:
+            recorder.begin_game(result["first"])
+            for move in result["moves"]:
+                recorder.append(move)
+            recorder.end_game(result["winner"])
+        # keep the summary only, the moves of every game would not fit in memory
+        del result["moves"]
+        results.append(result)
+    elapsed = time.perf_counter() - start
+
+    if output is not None:
+        output.close()
+    if recorder is not None:
+        recorder.close()
+
+    wins, draws, losses = score(results)
+    plies = sum(result["plies"] for result in results)
+    print("{} vs {}: {} games, +{} ={} -{}".format(
+        args.player, args.opponent, len(results), wins, draws, losses))
+    print("white wins {} black wins {} average length {:.1f} plies".format(
+        sum(1 for result in results if result["winner"] == "White"),
+        sum(1 for result in results if result["winner"] == "Black"),
+        plies / len(results) if results else 0.0))
+    print("{:.3f}s, {:.1f} games per second".format(
+        elapsed, len(results) / elapsed if elapsed > 0 else 0.0))
+
+
+if __name__ == "__main__":
+    main()
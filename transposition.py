@@ -0,0 +1,66 @@
+from array import array
+
+# kind of score stored in an entry
+EXACT = 0
+# the score is a lower bound (the search failed high)
+LOWER = 1
+# the score is an upper bound (the search failed low)
+UPPER = 2
+
+# every entry takes two 64-bit words: the key and the packed data
+ENTRY_BYTES = 16
+# scores are stored with this offset so they fit in an unsigned field
+SCORE_OFFSET = 1 << 31
+
+
+class TranspositionTable(object):
+    """Fixed-size hash table of search results keyed by Zobrist hash"""
+    def __init__(self, megabytes=16):
+        # number of entries, rounded down to a power of two for masking
+        entries = max(1, megabytes * 1024 * 1024 // ENTRY_BYTES)
+        self.size = 1 << (entries.bit_length() - 1)
+        self.mask = self.size - 1
+        # current search generation, entries from older searches are replaced first
+        self.age = 0
+        self.clear()
+
+    def clear(self):
+        self.keys = array("Q", bytes(8 * self.size))
+        # data layout from the low bits: move (16), depth (8), flag (2), age (6), score (32)
+        self.data = array("Q", bytes(8 * self.size))
+        # number of slots in use
+        self.used = 0
+
+    def new_search(self):
+        # start a new generation so stale entries give way to new ones
+        self.age = (self.age + 1) & 63
+
+    def store(self, key, depth, score, flag, move=0):
+        index = key & self.mask
+        old = self.data[index]
+        if old:
+            # keep a deeper result of the current search for another position
+            if (self.keys[index] != key and ((old >> 26) & 63) == self.age and
+                    ((old >> 16) & 255) > depth):
+                return
+        else:
+            self.used += 1
+        # keep the best move of an earlier search of the same position
+        if move == 0 and self.keys[index] == key:
+            move = old & 0xFFFF
+        self.keys[index] = key
+        self.data[index] = (move | (depth << 16) | (flag << 24) | (self.age << 26) |
+                            ((score + SCORE_OFFSET) << 32))
+
+    def probe(self, key):
+        # returns (depth, score, flag, move) or None when the position is unknown
+        index = key & self.mask
+        data = self.data[index]
+        if not data or self.keys[index] != key:
+            return None
+        return ((data >> 16) & 255, ((data >> 32) & 0xFFFFFFFF) - SCORE_OFFSET,
+                (data >> 24) & 3, data & 0xFFFF)
+
+    def hashfull(self):
+        # permille of the table in use
+        return self.used * 1000 // self.size
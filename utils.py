@@ -20,4 +20,33 @@ class Utils:
             # change left click flag
             left_click = True
 
-        return left_click
\ No newline at end of file
+        return left_click
+
+
+class BoardInput:
+    """Turns mouse positions into board squares with arithmetic instead of a scan"""
+    def __init__(self, offset, square_length, flipped=False):
+        # screen position of the top left corner of the board
+        self.offset_x, self.offset_y = offset
+        # length of the side of a chess board square
+        self.square_length = square_length
+        # True when the board is shown from black's side
+        self.flipped = flipped
+
+    def square_at(self, pos):
+        # [x, y] board coordinates under a screen position, None when off the board
+        column = (pos[0] - self.offset_x) // self.square_length
+        row = (pos[1] - self.offset_y) // self.square_length
+        if column < 0 or row < 0 or column > 7 or row > 7:
+            return None
+        if self.flipped:
+            return [7 - column, 7 - row]
+        return [column, row]
+
+    def clicks(self, events):
+        # yield [x, y] board coordinates for every left click on the board
+        for event in events:
+            if event.type == MOUSEBUTTONDOWN and event.button == 1:
+                selected = self.square_at(event.pos)
+                if selected is not None:
+                    yield selected
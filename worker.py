@@ -0,0 +1,72 @@
+import queue
+import threading
+
+from engine import Engine
+
+
+class SearchWorker(object):
+    """Runs engine searches on a background thread so the game loop keeps drawing"""
+    def __init__(self, engine=None):
+        self.engine = engine if engine is not None else Engine()
+        # positions to search, as (search id, board snapshot, stop event)
+        self.requests = queue.Queue()
+        # results streamed back as (search id, move, info, finished)
+        self.results = queue.Queue()
+        # set to cancel the latest search, every search gets its own event so
+        # cancelling one can never be undone by the thread starting it
+        self.stop = threading.Event()
+        # id of the latest search, results of older searches are dropped
+        self.search_id = 0
+        # True while the latest search has not sent its final result
+        self.busy = False
+
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while True:
+            search_id, board, stop = self.requests.get()
+            # None is sent by close()
+            if board is None:
+                break
+            # skip searches cancelled before they started
+            if stop.is_set():
+                continue
+
+            def report(move, info):
+                self.results.put((search_id, move, info, False))
+
+            move = self.engine.search(board, stop, report)
+            self.results.put((search_id, move, self.engine.info, True))
+
+    def start_search(self, board):
+        # search a snapshot of the board, cancelling any earlier search
+        self.cancel()
+        self.search_id += 1
+        self.busy = True
+        self.stop = threading.Event()
+        self.requests.put((self.search_id, board.copy(), self.stop))
+
+    def cancel(self):
+        # stop the running search, its results will be ignored
+        if self.busy:
+            self.stop.set()
+            self.search_id += 1
+            self.busy = False
+
+    def poll(self):
+        # latest (move, info, finished) of the current search, or None if nothing new
+        latest = None
+        while True:
+            try:
+                search_id, move, info, finished = self.results.get_nowait()
+            except queue.Empty:
+                return latest
+            if search_id == self.search_id:
+                latest = (move, info, finished)
+                if finished:
+                    self.busy = False
+
+    def close(self):
+        self.cancel()
+        self.requests.put((0, None, None))
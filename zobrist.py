@@ -0,0 +1,33 @@
+import random
+
+from bitboard import PIECE_NAMES, PIECE_CODES, PAWN, KIND
+
+# Zobrist keys: a position's hash is the xor of one random 64-bit key for
+# every (piece, square) on the board, plus SIDE_KEY when black is to move.
+# A fixed seed keeps hashes stable between runs so they can be stored on disk.
+_rng = random.Random(0x7A0B7157)
+
+# keys of each square by piece code, None for unused codes
+PIECE_KEYS = [None] * 16
+for _name in PIECE_NAMES:
+    PIECE_KEYS[PIECE_CODES[_name]] = [_rng.getrandbits(64) for _ in range(64)]
+SIDE_KEY = _rng.getrandbits(64)
+
+
+def board_hash(board, turn):
+    # full hash of the 64 piece codes of a board and the side to move
+    key = SIDE_KEY if turn == "black" else 0
+    for sq, piece in enumerate(board):
+        if piece:
+            key ^= PIECE_KEYS[piece][sq]
+    return key
+
+
+def pawn_hash(board):
+    # hash of the pawns alone of the 64 piece codes of a board, see
+    # evaluation.PawnTable
+    key = 0
+    for sq, piece in enumerate(board):
+        if piece & KIND == PAWN:
+            key ^= PIECE_KEYS[piece][sq]
+    return key